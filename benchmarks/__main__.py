@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+import warnings
+from benchmarks.suite import *
+
+
+def parse_args(args: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Замеры скорости парсеров, конвертера и ConverterApp')
+    parser.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES),
+                        help='число постов в синтетических бюллетенях (от 10 до 100000)')
+    parser.add_argument('--repeat', type=int, default=3, help='число повторов каждого замера')
+    parser.add_argument('--filter', default=None, help='регулярное выражение для имён замеров')
+    parser.add_argument('--no-app', action='store_true', help='не запускать сквозные замеры ConverterApp')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH, help='файл с базовыми результатами')
+    parser.add_argument('--save-baseline', action='store_true', help='записать результаты как базовые')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='допустимое замедление относительно базы')
+    return parser.parse_args(args)
+
+
+def main(args: list[str] = None) -> int:
+    options = parse_args(args)
+    warnings.simplefilter('ignore')
+    os.environ.setdefault('CPL_LOG', os.devnull)
+    baseline = Baseline(options.baseline)
+
+    def report(result: BenchmarkResult) -> None:
+        previous = baseline.results.get(result.name)
+        change = '' if previous is None else f'{result.best / previous:8.2f}x'
+        print(f'{result.name:<36}{result.best * 1000:12.2f} ms{result.mean * 1000:12.2f} ms {change}', flush=True)
+
+    print(f'{"benchmark":<36}{"best":>15}{"mean":>15} vs baseline')
+    suite = BenchmarkSuite(tuple(options.scales), options.repeat, not options.no_app)
+    results = suite.run(options.filter, report)
+    for note in suite.notes(options.filter):
+        print(f'note: {note}')
+    if options.save_baseline:
+        baseline.save(results)
+        return 0
+    regressions = baseline.compare(results, options.tolerance)
+    for regression in regressions:
+        print(f'regression: {regression.name} {regression.baseline * 1000:.2f} ms -> '
+              f'{regression.current * 1000:.2f} ms ({regression.ratio:.2f}x)')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+import io
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from xml.sax.saxutils import escape
+import docx
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from geopandas import GeoDataFrame
+from shapely.geometry import Point
+
+ZS_START_LINE = ':-------------+--------------+---------+--------+--------+--------+---------+-------------------:--------:\n'
+ZS_END_LINE = '----------------------------------------------------------------------------------------------------------\n'
+OI_CONFIDENTIAL_LINE = ('Настоящая информация не подлежит разглашению в общем или частном порядке без '
+                        'предварительного согласования')
+
+_SYLLABLES = ['ба', 'ве', 'го', 'да', 'ель', 'жи', 'зо', 'ка', 'ли', 'мо', 'ню', 'пы', 'ра', 'се', 'ту', 'ха', 'чи',
+              'шо', 'юр', 'ян']
+_ICE = ['чисто', 'ледостав', 'забереги', 'шуга', 'ледоход', 'закраины']
+
+
+@dataclass(frozen=True)
+class Station:
+    water_name: str
+    name: str
+    bulletin_water_name: str
+    bulletin_name: str
+    x: float
+    y: float
+
+
+def _word(number: int, min_syllables: int) -> str:
+    syllables = list()
+    while number > 0 or len(syllables) < min_syllables:
+        number, digit = divmod(number, len(_SYLLABLES))
+        syllables.append(_SYLLABLES[digit])
+    return ''.join(syllables).capitalize()
+
+
+def stations(count: int, misspelled_share: float = 0.1, seed: int = 0) -> list[Station]:
+    generator = random.Random(seed)
+    rivers = [_word(river, 2) for river in range(max(1, count // 8))]
+    result = list()
+    for index in range(count):
+        water_name = rivers[index % len(rivers)]
+        name = _word(index, 3)
+        bulletin_name = name
+        if generator.random() < misspelled_share:
+            bulletin_name = name[:-1] if len(name) > 4 else name + 'а'
+        result.append(Station(water_name=water_name,
+                              name=name,
+                              bulletin_water_name=water_name,
+                              bulletin_name=bulletin_name,
+                              x=60 + generator.random() * 60,
+                              y=45 + generator.random() * 25))
+    return result
+
+
+def template(points: list[Station]) -> GeoDataFrame:
+    return GeoDataFrame({
+        'river': [station.water_name for station in points],
+        'name': [station.name for station in points],
+        'geometry': [Point(station.x, station.y) for station in points]
+    }, crs='EPSG:4326')
+
+
+def write_template(points: list[Station], path: Path) -> Path:
+    template(points).to_file(path, encoding='utf-8')
+    return path
+
+
+def renames(points: list[Station]) -> dict[str, str]:
+    return {station.bulletin_name: station.name for station in points if station.bulletin_name != station.name}
+
+
+def write_renames(points: list[Station], path: Path) -> Path:
+    lines = [f'{source};{target}\n' for source, target in renames(points).items()]
+    path.write_text(''.join(lines) or 'Пусто;Пусто\n', encoding='utf-8')
+    return path
+
+
+def _measurements(index: int) -> tuple[str, str, str, str]:
+    generator = random.Random(index)
+    level = str(generator.randint(50, 950))
+    change = f'{generator.randint(-30, 30):+d}'
+    ice = _ICE[index % len(_ICE)]
+    flood = str(generator.randint(300, 1200))
+    return level, change, ice, flood
+
+
+def zs_lines(points: list[Station], continuation_every: int = 5) -> list[str]:
+    lines = ['ЗАПАДНО-СИБИРСКОЕ УГМС\n', 'Гидрологический бюллетень\n', ZS_START_LINE]
+    for index, station in enumerate(points):
+        level, change, ice, flood = _measurements(index)
+        lines.append(_zs_row('р.' + station.bulletin_water_name, station.bulletin_name, level, change, ice, flood))
+        if continuation_every and index % continuation_every == 0:
+            lines.append(_zs_row('', '', '', '', 'у берегов', ''))
+    lines.extend([ZS_END_LINE, 'Начальник отдела гидрологических прогнозов\n'])
+    return lines
+
+
+def _zs_row(water_name: str, name: str, level: str, change: str, ice: str, flood: str) -> str:
+    return (f':{water_name:<13}:{name:<14}:{level:>9}:{change:>8}:{"":>8}:{"":>8}:{"":>9}:'
+            f'{ice:<19}:{flood:>8}:\n')
+
+
+def zs_bytes(points: list[Station], encoding: str = 'cp866') -> bytes:
+    return ''.join(zs_lines(points)).encode(encoding)
+
+
+def b_rows(points: list[Station]) -> list[list[str]]:
+    rows = [['Река – пункт', 'Уровень', 'Изменение', 'Лед', 'Пойма', 'Опасный', 'Примечание', 'Код']]
+    for index, station in enumerate(points):
+        level, change, ice, flood = _measurements(index)
+        rows.append([f'{station.bulletin_water_name} – {station.bulletin_name}', level, change, ice,
+                     str(int(flood) - 100), flood, '', str(index)])
+    return rows
+
+
+def zb_rows(points: list[Station]) -> list[list[str]]:
+    rows = [['Река – пункт', 'Уровень', 'Изменение', 'Лед', 'Пойма', 'Примечание', 'Код']]
+    for index, station in enumerate(points):
+        level, change, ice, flood = _measurements(index)
+        rows.append([f'{station.bulletin_water_name} – {station.bulletin_name}', level, change, ice, flood, '',
+                     str(index)])
+    return rows
+
+
+def i_rows(points: list[Station]) -> list[list[str]]:
+    rows = [['Водный объект – пункт', 'Уровень', 'Изменение', 'Отметка', 'Опасный']]
+    for index, station in enumerate(points):
+        level, change, ice, flood = _measurements(index)
+        rows.append([f'{station.bulletin_water_name} – {station.bulletin_name}', level, change, '', flood])
+    return rows
+
+
+def docx_document(rows: list[list[str]], chunk_size: int = 500) -> docx.Document:
+    document = docx.Document()
+    document.add_paragraph('Гидрологический бюллетень')
+    grid = '<w:gridCol/>' * max(len(row) for row in rows)
+    table = parse_xml(f'<w:tbl {nsdecls("w")}><w:tblPr/><w:tblGrid>{grid}</w:tblGrid></w:tbl>')
+    document.element.body.sectPr.addprevious(table)
+    # python-docx adds rows in quadratic time and so does moving one huge subtree between lxml documents,
+    # large tables are parsed from raw WordprocessingML in small chunks instead
+    for start in range(0, len(rows), chunk_size):
+        body = ''.join(f'<w:tr>{"".join(_docx_cell(cell) for cell in row)}</w:tr>'
+                       for row in rows[start:start + chunk_size])
+        table.extend(list(parse_xml(f'<w:tbl {nsdecls("w")}>{body}</w:tbl>')))
+    return document
+
+
+def _docx_cell(text: str) -> str:
+    return f'<w:tc><w:p><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p></w:tc>'
+
+
+def docx_bytes(rows: list[list[str]]) -> bytes:
+    buffer = io.BytesIO()
+    docx_document(rows).save(buffer)
+    return buffer.getvalue()
+
+
+def oi_rows(points: list[Station]) -> list[list[str]]:
+    rows = [['Обь-Иртышское УГМС'] + [''] * 13,
+            ['Река', 'Пункт', 'Код', 'Уровень', 'Изменение', 'начальная дата', '', '', '', '', '', 'Опасный',
+             'Пойма', 'Ледовые явления'],
+            [''] * 5 + ['начальная дата'] + [''] * 8]
+    for index, station in enumerate(points):
+        level, change, ice, flood = _measurements(index)
+        rows.append([station.bulletin_water_name, station.bulletin_name, str(index), level, change, '', '', '', '',
+                     '', '', flood, str(int(flood) - 100), ice])
+    rows.append([OI_CONFIDENTIAL_LINE] + [''] * 13)
+    return rows
+
+
+class SyntheticSheet:
+
+    def __init__(self, rows: list[list[str]]):
+        self.__rows = rows
+
+    @property
+    def nrows(self) -> int:
+        return len(self.__rows)
+
+    def row_values(self, row: int) -> list[str]:
+        return list(self.__rows[row])
+
+    def cell_value(self, row: int, column: int) -> str:
+        return self.__rows[row][column]
+
+
+def write_xls(rows: list[list[str]], path: Path) -> Path | None:
+    try:
+        import xlwt
+    except ImportError:
+        return None
+    workbook = xlwt.Workbook(encoding='utf-8')
+    sheet = workbook.add_sheet('Бюллетень')
+    for row_index, row in enumerate(rows):
+        for column_index, value in enumerate(row):
+            sheet.write(row_index, column_index, value)
+    workbook.save(str(path))
+    return path
+
+
+def write_bulletins(points: list[Station], directory: Path, include_oi: bool = True) -> list[Path]:
+    directory.mkdir(parents=True, exist_ok=True)
+    files = [directory.joinpath('bulletin_zs.txt'),
+             directory.joinpath('bulletin_b.docx'),
+             directory.joinpath('bulletin_zb.docx'),
+             directory.joinpath('bulletin_i.docx')]
+    files[0].write_bytes(zs_bytes(points))
+    files[1].write_bytes(docx_bytes(b_rows(points)))
+    files[2].write_bytes(docx_bytes(zb_rows(points)))
+    files[3].write_bytes(docx_bytes(i_rows(points)))
+    if include_oi:
+        oi_file = write_xls(oi_rows(points), directory.joinpath('bulletin_oi.xls'))
+        if oi_file is not None:
+            files.append(oi_file)
+    return files
@@ -0,0 +1,221 @@
+import asyncio
+import gc
+import io
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterator
+import docx
+from converter import *
+from serialization import *
+from benchmarks.generators import *
+
+DEFAULT_SCALES = (10, 1000, 10000)
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    name: str
+    run: Callable[[Any], Any]
+    setup: Callable[[], Any] = lambda: None
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    name: str
+    best: float
+    mean: float
+    repeat: int
+
+
+@dataclass(frozen=True)
+class Regression:
+    name: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline
+
+
+class BenchmarkSuite:
+
+    __PARSERS = (ParserZS, ParserZB, ParserB, ParserI, ParserOI)
+    __NOTES = {
+        'parse/OI': 'parse/OI читает SyntheticSheet, чтение настоящего xls этими замерами не измеряется',
+    }
+
+    def __init__(self, scales: tuple[int, ...] = DEFAULT_SCALES, repeat: int = 3, include_app: bool = True):
+        self.__scales = scales
+        self.__repeat = repeat
+        self.__include_app = include_app
+
+    def run(self, pattern: str = None, report: Callable[[BenchmarkResult], None] = None) -> list[BenchmarkResult]:
+        work_dir = Path(tempfile.mkdtemp(prefix='planet_benchmarks_'))
+        try:
+            results = list()
+            for benchmark in self.benchmarks(work_dir, pattern):
+                result = self.measure(benchmark, self.__repeat)
+                results.append(result)
+                if report is not None:
+                    report(result)
+            return results
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    # Caveats of the selected benchmarks that the timings alone do not show
+    def notes(self, pattern: str = None) -> list[str]:
+        return [note for prefix, note in self.__NOTES.items()
+                if any(pattern is None or re.search(pattern, f'{prefix}/{scale}') is not None
+                       for scale in self.__scales)]
+
+    @staticmethod
+    def measure(benchmark: Benchmark, repeat: int) -> BenchmarkResult:
+        timings = list()
+        for _ in range(repeat):
+            state = benchmark.setup()
+            gc.collect()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                benchmark.run(state)
+                timings.append(time.perf_counter() - start)
+            finally:
+                gc.enable()
+        return BenchmarkResult(benchmark.name, min(timings), statistics.fmean(timings), repeat)
+
+    # Synthetic inputs are only generated for benchmarks selected by the pattern, 100k docx tables are not cheap
+    def benchmarks(self, work_dir: Path, pattern: str = None) -> Iterator[Benchmark]:
+        def selected(name: str) -> bool:
+            return pattern is None or re.search(pattern, name) is not None
+
+        for scale in self.__scales:
+            scale_dir = work_dir.joinpath(str(scale))
+            scale_dir.mkdir()
+            points = stations(scale)
+            yield from self.__parser_benchmarks(scale, points, selected)
+            template_path = scale_dir.joinpath('template.shp')
+            yield from self.__converter_benchmarks(scale, points, template_path, selected)
+            if self.__include_app:
+                yield from self.__app_benchmarks(scale, points, scale_dir, template_path, selected)
+
+    @staticmethod
+    def __parser_benchmarks(scale: int, points: list[Station], selected: Callable[[str], bool]) -> Iterator[Benchmark]:
+        exports = [(observation_format, f'export/{observation_format.value}/{scale}')
+                   for observation_format in ObservationFormat]
+        if selected(f'read/ZS/{scale}') or selected(f'parse/ZS/{scale}') or any(selected(name) for _, name in exports):
+            zs_content = zs_bytes(points)
+            zs_table = ParserZS.extract_table(zs_content)
+            if selected(f'read/ZS/{scale}'):
+                yield Benchmark(f'read/ZS/{scale}', lambda _: ParserZS.extract_table(zs_content))
+            if selected(f'parse/ZS/{scale}'):
+                yield Benchmark(f'parse/ZS/{scale}', lambda _: ParserZS.parse_batch(zs_table))
+            for observation_format, name in exports:
+                if selected(name):
+                    zs_batch = ParserZS.parse_batch(zs_table)
+                    yield Benchmark(name, lambda _, f=observation_format, b=zs_batch:
+                                    ObservationWriter.write(b, io.StringIO(), f))
+        for parser, rows in ((ParserB, b_rows), (ParserZB, zb_rows), (ParserI, i_rows)):
+            name = f'parse/{parser.UGMS_CODE}/{scale}'
+            if selected(name):
+                tables = docx.Document(io.BytesIO(docx_bytes(rows(points)))).tables
+                yield Benchmark(name, lambda _, p=parser, t=tables: p.parse_batch(t))
+        if selected(f'parse/OI/{scale}'):
+            sheet = SyntheticSheet(oi_rows(points))
+            yield Benchmark(f'parse/OI/{scale}', lambda _: ParserOI.parse_batch(sheet))
+
+    @staticmethod
+    def __converter_benchmarks(scale: int, points: list[Station], template_path: Path,
+                               selected: Callable[[str], bool]) -> Iterator[Benchmark]:
+        for mode, mode_renames in (('renames', renames(points)), ('experimental', None)):
+            name = f'convert/{mode}/{scale}'
+            if not selected(name):
+                continue
+            if not template_path.exists():
+                write_template(points, template_path)
+            template = TemplateRegistry.load(template_path)
+            template_index = TemplateRegistry.index(template_path)
+            zs_table = zs_lines(points)
+
+            def setup(mode_renames=mode_renames):
+                converter = Converter(template, mode_renames, '-', None, None, template_index)
+                return converter, ParserZS.parse_batch(zs_table)
+            yield Benchmark(name, lambda state: state[0].convert(state[1]), setup)
+
+    def __app_benchmarks(self, scale: int, points: list[Station], scale_dir: Path, template_path: Path,
+                         selected: Callable[[str], bool]) -> Iterator[Benchmark]:
+        runs = [(entry, mode, is_async)
+                for entry, mode, is_async in (('sync', 'renames', False),
+                                              ('async', 'renames', True),
+                                              ('async', 'experimental', True))
+                if selected(f'app/{entry}-{mode}/{scale}')]
+        if not runs:
+            return
+        if not template_path.exists():
+            write_template(points, template_path)
+        input_dir = scale_dir.joinpath('Input')
+        write_bulletins(points, input_dir)
+        renames_path = write_renames(points, scale_dir.joinpath('renames.csv'))
+        writer_pool = WriterPool()
+        for entry, mode, is_async in runs:
+            output_dir = scale_dir.joinpath(f'Output_{entry}_{mode}')
+
+            def setup(output_dir=output_dir, mode=mode):
+                shutil.rmtree(output_dir, ignore_errors=True)
+                match_cache = output_dir.parent.joinpath('match_cache.json')
+                if match_cache.exists():
+                    os.remove(match_cache)
+                filesys = FileSys(input_dir, output_dir, None, renames_path if mode == 'renames' else None,
+                                  template_path)
+                return ConverterApp(filesys, '-', None, *self.__PARSERS, writer_pool=writer_pool)
+
+            def run(app: ConverterApp, is_async=is_async):
+                if is_async:
+                    return asyncio.run(app.convert_async(force=True))
+                return app.convert(force=True)
+            yield Benchmark(f'app/{entry}-{mode}/{scale}', run, setup)
+
+
+class Baseline:
+
+    def __init__(self, path: Path | str = BASELINE_PATH):
+        self.__path = Path(path)
+        self.__results = self.__read()
+
+    @property
+    def results(self) -> dict[str, float]:
+        return self.__results
+
+    def compare(self, results: list[BenchmarkResult], tolerance: float = 0.25) -> list[Regression]:
+        regressions = list()
+        for result in results:
+            baseline = self.__results.get(result.name)
+            if baseline is not None and result.best > baseline * (1 + tolerance):
+                regressions.append(Regression(result.name, baseline, result.best))
+        return regressions
+
+    def save(self, results: list[BenchmarkResult]) -> None:
+        self.__results.update({result.name: result.best for result in results})
+        data = {
+            'machine': f'{platform.system()} {platform.machine()}, {os.cpu_count()} CPU',
+            'python': platform.python_version(),
+            'results': dict(sorted(self.__results.items())),
+        }
+        with open(self.__path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=1)
+
+    def __read(self) -> dict[str, float]:
+        try:
+            with open(self.__path, 'r', encoding='utf-8') as file:
+                return json.load(file)['results']
+        except (OSError, ValueError, KeyError):
+            return dict()
@@ -1,7 +1,9 @@
 import difflib
+import functools
 import os
 import sys
-from typing import Type, Coroutine, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import Type, Coroutine, Any, Callable, Iterator
 import xlrd
 import numpy as np
 import pandas
@@ -9,33 +11,62 @@ import numpy
 import geopandas
 import docx
 import io
+import mmap
 import asyncio
-import win32com.client
-import tempfile
 from geopandas import GeoDataFrame
 from pathlib import Path
+from documents import *
+from manifest import *
 from parser import *
 from entities import *
+from matching import *
+from metrics import *
+from profiling import *
+from reports import *
+from retry import *
+from templates import *
+from watcher import *
+from writers import *
 from utils import *
 
 
 class FileSys:
 
     __DEFAULT_PRJ = 'resources\\prj.txt'
+    __MATCH_CACHE = 'match_cache.json'
+    __TEMPLATE_CACHE = '.template_cache'
+    __DOC_CACHE = '.doc_cache'
+
+    doc_converter: DocConversionCache = None
+
+    __loaded_renames: dict[Path, tuple[int, dict[str, str]]] = dict()
 
     def __init__(self, input_path: Path | str = None,
                  output_path: Path | str = None,
                  prj_path: Path | str = None,
                  name_changer_path: Path | str = None,
-                 template_path: Path | str = None):
+                 template_path: Path | str = None,
+                 output_format: OutputFormat = OutputFormat.SHAPEFILE,
+                 bundle_output: bool = False):
+        self.__output_format = output_format
+        self.__bundle_output = bundle_output
+        self.__writer = None
         self.__set_paths(input_path, output_path)
         self.__load_prj(prj_path)
         self.__load_name_changer(name_changer_path)
         self.__load_template(template_path)
 
+    @property
+    def input_dir(self) -> Path:
+        return self.__input_dir
+
     @property
     def input_files(self) -> list[Path]:
-        return [file for file in self.__input_dir.iterdir() if not file.name.startswith('~$')]
+        return [file for file in self.__input_dir.iterdir() if self.is_input_file(file)]
+
+    @staticmethod
+    def is_input_file(file: Path) -> bool:
+        return not file.name.startswith('~$')
 
     @property
     def output_files(self) -> list[Path]:
@@ -49,12 +80,36 @@ class FileSys:
     def template(self) -> GeoDataFrame:
         return self.__template
 
+    @property
+    def template_path(self) -> Path | None:
+        return self.__template_path
+
+    @property
+    def template_index(self) -> TemplateIndex | None:
+        if self.__template_path is None:
+            return None
+        return TemplateRegistry.index(self.__template_path, self.template_cache_dir)
+
+    @property
+    def template_fingerprint(self) -> str:
+        if self.__template_path is None:
+            return ''
+        return TemplateRegistry.fingerprint(self.__template_path)
+
+    @property
+    def match_cache_path(self) -> Path:
+        return self.__output_dir.parent.joinpath(self.__MATCH_CACHE)
+
+    @property
+    def template_cache_dir(self) -> Path:
+        return self.__output_dir.parent.joinpath(self.__TEMPLATE_CACHE)
+
     @classmethod
     def read_file(cls, file: Path | str):
         file = cls.__convert_to_path(file)
         extension = file.suffix
         if extension == '.txt':
-            return cls.__read_txt(file)
+            return cls.__read_bulletin_txt(file)
         elif extension == '.docx':
             return cls.__read_docx(file)
         elif extension == '.doc':
@@ -68,12 +123,35 @@ class FileSys:
     async def read_file_async(cls, file: Path | str):
         return cls.read_file(file)
 
+    @property
+    def output_dir(self) -> Path:
+        return self.__output_dir
+
+    @property
+    def output_format(self) -> OutputFormat:
+        return self.__output_format
+
+    def output_path(self, name: str) -> Path | None:
+        return self.__get_writer().output_path(name)
+
+    def save(self, geodataframe: GeoDataFrame | None, name: str, source: BulletinSource = None) -> None:
+        if geodataframe is None:
+            return
+        self.__get_writer().write(geodataframe, name, source)
+
+    def flush(self) -> None:
+        if self.__writer is None:
+            return
+        self.__writer.close()
+        self.__writer = None
+
+    def __get_writer(self) -> OutputWriter:
+        if self.__writer is None:
+            self.__writer = OutputWriter.create(self.__output_format, self.__output_dir, self.__bundle_output)
+        return self.__writer
+
     def save_to_shape_file(self, geodataframe: GeoDataFrame, name):
-        output_dir = self.__output_dir.joinpath(name)
-        if not (output_dir.exists()):
-            Path.mkdir(output_dir)
-        file_path = output_dir.joinpath(f'{name}.shp')
-        geodataframe.to_file(str(file_path), encoding='utf-8')
+        ShapefileWriter(self.__output_dir).write(geodataframe, name)
         # self.__add_prj(name)
 
     def __set_paths(self, input_path: Path | str | None, output_path: Path | str | None) -> None:
@@ -133,7 +211,17 @@ class FileSys:
         if not path.exists():
             self.__renames = None
             raise MissingNameChangerException
-        self.__renames = NameChangerParser.parse(pandas.read_csv(path, header=None, encoding='utf-8', sep=";"))
+        self.__renames = self.__read_name_changer(path)
+
+    @classmethod
+    def __read_name_changer(cls, path: Path) -> dict[str, str]:
+        path = path.resolve()
+        version = path.stat().st_mtime_ns
+        cached = cls.__loaded_renames.get(path)
+        if cached is None or cached[0] != version:
+            renames = NameChangerParser.parse(pandas.read_csv(path, header=None, encoding='utf-8', sep=";"))
+            cached = cls.__loaded_renames[path] = (version, renames)
+        return cached[1]
 
     @staticmethod
     def __read_txt(file_path: Path) -> list[str]:
@@ -141,6 +229,14 @@ class FileSys:
             lines = file.readlines()
         return lines
 
+    @staticmethod
+    def __read_bulletin_txt(file_path: Path) -> list[str]:
+        with open(file_path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return list()
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return ParserZS.extract_table(mapped)
+
     @staticmethod
     def __read_xls(file_path: Path):
         workbook = xlrd.open_workbook(file_path)
@@ -154,19 +250,11 @@ class FileSys:
     def __read_doc(cls, file_path: Path):
         return cls.__convert_doc_to_docx(file_path).tables
 
-    @staticmethod
-    def __convert_doc_to_docx(file_path: Path):
-        word_app = win32com.client.Dispatch('Word.Application')
-        doc = word_app.Documents.Open(str(file_path))
-        temp_file = tempfile.NamedTemporaryFile(suffix='.docx', delete=False)
-        temp_file_path = temp_file.name
-        temp_file.close()
-        doc.SaveAs(temp_file_path, FileFormat=16)
-        doc.Close()
-        word_app.Quit()
-        with open(temp_file_path, 'rb') as f:
-            docx_content = f.read()
-        os.remove(temp_file_path)
+    @classmethod
+    def __convert_doc_to_docx(cls, file_path: Path):
+        if cls.doc_converter is None:
+            cls.doc_converter = DocConversionCache(cls.__get_executable_path().joinpath(cls.__DOC_CACHE))
+        docx_content = cls.doc_converter.convert(file_path)
         return docx.Document(io.BytesIO(docx_content))
 
     def __add_prj(self, file_name) -> None:
@@ -178,23 +266,109 @@ class FileSys:
     def __load_template(self, path: Path | str | None) -> None:
         path = self.__convert_to_path(path)
         if path is None or not path.exists():
+            self.__template_path = None
             self.__template = None
             return
-        self.__template = geopandas.read_file(path)
-        original_template_columns = ['river', 'name', 'geometry']
-        self.__template = self.__template[original_template_columns]
-        self.__template = self.__template.rename(
-            columns={
-                'river': WaterNameProperty.dataframe_name(),
-                'name': NameProperty.dataframe_name()
-            }
-        )
+        self.__template_path = path
+        self.__template = TemplateRegistry.load(path, self.template_cache_dir)
 
 
 @dataclass(frozen=True)
 class ParseResult:
     parser: Type[UGMSParserBase]
-    objects: list[ObservationPointDTOBase]
+    objects: ObservationBatch
+
+    @classmethod
+    def parse(cls, content, parsers: tuple[Type[UGMSParserBase], ...]) -> 'ParseResult':
+        for parser in cls.__sniff(content, parsers):
+            try:
+                result = parser.parse_batch(content)
+                return cls(parser=parser, objects=result)
+            except ParseException:
+                pass
+        raise UnknownFormatException()
+
+    @classmethod
+    async def parse_async(cls, content, parsers: tuple[Type[UGMSParserBase], ...]) -> 'ParseResult':
+        for parser in cls.__sniff(content, parsers):
+            try:
+                result = await parser.parse_batch_async(content)
+                return cls(parser=parser, objects=result)
+            except ParseException:
+                pass
+        raise UnknownFormatException()
+
+    # Usually exactly one parser recognizes the content. When none does, for example because a bulletin has a header the
+    # fingerprints do not know, every parser is tried in the configured order as before.
+    @staticmethod
+    def __sniff(content, parsers: tuple[Type[UGMSParserBase], ...]) -> list[Type[UGMSParserBase]]:
+        return [parser for parser in parsers if parser.matches(content)] or list(parsers)
+
+
+@dataclass(frozen=True)
+class ConversionTask:
+    file: Path
+    parsers: tuple[Type[UGMSParserBase], ...]
+    template_path: Path | None
+    renames: dict[str, str] | None
+    null_symbol: str | None
+    match_cache_path: Path | None
+    template_cache_dir: Path | None = None
+    trace_memory: bool = False
+    profiling: ProfilingOptions | None = None
+    retry: RetryPolicy = RetryPolicy()
+
+
+@dataclass(frozen=True)
+class ConversionResult:
+    parser: Type[UGMSParserBase]
+    geodataframe: GeoDataFrame | None
+    unmatched: list[tuple[str, str]]
+    stages: tuple[StageMetrics, ...] = ()
+
+
+@dataclass
+class PipelineFile:
+    file: Path
+    key: ManifestKey
+    recorder: StageRecorder | None = None
+    profiler: FileProfiler | None = None
+    content: Any = None
+
+
+class ConversionWorker:
+
+    __converters: dict[tuple, 'Converter'] = dict()
+
+    @classmethod
+    def run(cls, task: ConversionTask) -> ConversionResult:
+        profiler = FileProfiler.create(task.profiling, task.file)
+        recorder = StageRecorder(task.trace_memory, profiler)
+        try:
+            with MemoryTracing.enabled(task.trace_memory):
+                with recorder.stage('read'):
+                    content = task.retry.call(FileSys.read_file, task.file)
+                with recorder.stage('parse'):
+                    parsed = ParseResult.parse(content, task.parsers)
+                unmatched = list()
+                geodataframe = cls.__get_converter(task).convert(parsed.objects, unmatched, recorder)
+        finally:
+            if profiler is not None:
+                profiler.dump()
+        return ConversionResult(parsed.parser, geodataframe, unmatched, tuple(recorder.stages))
+
+    @classmethod
+    def __get_converter(cls, task: ConversionTask) -> 'Converter':
+        renames = None if task.renames is None else tuple(sorted(task.renames.items()))
+        key = (task.template_path, renames, task.null_symbol, task.match_cache_path)
+        if key not in cls.__converters:
+            template = None if task.template_path is None else \
+                TemplateRegistry.load(task.template_path, task.template_cache_dir)
+            template_index = None if task.template_path is None else \
+                TemplateRegistry.index(task.template_path, task.template_cache_dir)
+            cls.__converters[key] = Converter(template, task.renames, task.null_symbol, None,
+                                              task.match_cache_path, template_index)
+        return cls.__converters[key]
 
 
 class ConverterApp:
@@ -203,11 +377,28 @@ class ConverterApp:
                  filesys: FileSys,
                  null_symbol: str = None,
                  logger: Logger = None,
-                 *parsers: Type[UGMSParserBase]):
+                 *parsers: Type[UGMSParserBase],
+                 writer_pool: WriterPool = None,
+                 process_pool: ProcessPoolExecutor = None,
+                 trace_memory: bool = False,
+                 profiling: ProfilingOptions = None,
+                 unmatched_report: ReportFormat | None = ReportFormat.CSV,
+                 retry: RetryPolicy = RetryPolicy(),
+                 max_in_flight: int = 4):
         self.__filesys = filesys
         self.__parsers = parsers
         self.__null_symbol = null_symbol
         self.__logger = logger
+        self.__writer_pool = writer_pool or WriterPool()
+        self.__process_pool = process_pool
+        self.__trace_memory = trace_memory
+        self.__profiling = profiling
+        self.__retry = retry
+        self.__max_in_flight = max(1, max_in_flight)
+        self.__run_report = RunReport(filesys.output_dir)
+        self.__unmatched_report = None
+        if unmatched_report is not None:
+            self.__unmatched_report = UnmatchedReport(filesys.output_dir, unmatched_report)
         self.__create_converter()
 
     @property
@@ -219,52 +410,284 @@ class ConverterApp:
         self.__null_symbol = value
         self.__create_converter()
 
-    def convert(self) -> None:
+    # A file that fails is recorded in the run report and left out of the manifest, so the next run retries it
+    def convert(self, force: bool = False) -> RunMetrics:
+        manifest = RunManifest(self.__filesys.output_dir)
+        metrics = RunMetrics()
+        files = list()
         for file in self.__filesys.input_files:
-            self.__convert_file(file)
-
-    async def convert_async(self) -> None:
-        tasks = list()
-        for file in self.__filesys.input_files:
-            tasks.append(self.__convert_file_async(file))
-        await asyncio.gather(*tasks)
+            try:
+                key = self.__retry.call(self.__manifest_key, manifest, file)
+            except Exception as error:
+                self.__fail(metrics, file, error)
+                continue
+            if force or not manifest.is_current(file, key):
+                files.append((file, key))
+        with MemoryTracing.enabled(self.__trace_memory):
+            for (file, key), outcome in zip(files, self.__process_all([file for file, _ in files])):
+                try:
+                    result = outcome()
+                except Exception as error:
+                    self.__fail(metrics, file, error)
+                    continue
+                self.__save(manifest, file, key, result, metrics)
+        self.__flush_output(metrics)
+        manifest.save()
+        self.__run_report.write(metrics)
+        if self.__logger is not None:
+            self.__logger.flush()
+        return metrics
+
+    async def convert_async(self, force: bool = False) -> RunMetrics:
+        manifest = RunManifest(self.__filesys.output_dir)
+        metrics = RunMetrics()
+        with MemoryTracing.enabled(self.__trace_memory):
+            await self.__run_pipeline(self.__filesys.input_files, manifest, metrics, force)
+            await self.__finish_async(manifest, metrics)
+        return metrics
+
+    async def watch(self, stop: asyncio.Event = None, settle: float = 2.0, interval: float = 1.0) -> None:
+        watcher = DirectoryWatcher.create(self.__filesys.input_dir, settle, interval)
+        manifest = RunManifest(self.__filesys.output_dir)
+        async for file in watcher.changes(stop):
+            if not FileSys.is_input_file(file):
+                continue
+            try:
+                metrics = RunMetrics()
+                await self.__run_pipeline([file], manifest, metrics, False)
+                await self.__finish_async(manifest, metrics)
+            except Exception as e:
+                await self.__log(f'Не удалось конвертировать {file.name}: {e}')
+
+    async def __finish_async(self, manifest: RunManifest, metrics: RunMetrics) -> None:
+        await self.__writer_pool.flush()
+        await self.__writer_pool.submit(self.__flush_output, metrics)
+        await self.__writer_pool.flush()
+        manifest.save()
+        self.__run_report.write(metrics)
+        if self.__logger is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.__logger.flush)
+
+    def __flush_output(self, metrics: RunMetrics) -> None:
+        try:
+            self.__retry.call(self.__filesys.flush)
+        except Exception as error:
+            self.__fail(metrics, self.__filesys.output_dir, error, 'write')
+
+    def __fail(self, metrics: RunMetrics, file: Path, error: Exception, stage: str = 'read') -> None:
+        failure = FileFailure.of(file.name, error, stage)
+        metrics.failures.append(failure)
+        if self.__logger is not None:
+            self.__logger.log_nowait(f'Не удалось конвертировать {file.name} на этапе {failure.stage}: {failure.message}')
+
+    async def __log(self, message: str) -> None:
+        if self.__logger is None:
+            return
+        await self.__logger.log(message)
 
     def __create_converter(self) -> None:
         self.__converter = Converter(self.__filesys.template,
                                      self.__filesys.renames,
                                      self.__null_symbol,
-                                     self.__logger)
+                                     self.__logger,
+                                     self.__filesys.match_cache_path,
+                                     self.__filesys.template_index)
+
+    def __manifest_key(self, manifest: RunManifest, file: Path) -> ManifestKey:
+        renames = self.__filesys.renames
+        return ManifestKey(
+            content_hash=manifest.content_hash(file),
+            parsers=','.join(parser.__name__ for parser in self.__parsers),
+            template_fingerprint=self.__filesys.template_fingerprint,
+            rename_fingerprint=RunManifest.fingerprint(None if renames is None else sorted(renames.items())),
+            null_symbol=self.__null_symbol,
+            output_format=self.__filesys.output_format.value)
+
+    def __record(self, manifest: RunManifest, file: Path, key: ManifestKey, result: ConversionResult) -> None:
+        manifest.record(file, key, result.parser.UGMS_CODE, self.__filesys.output_path(self.__output_name(file, result)))
 
-    def __convert_file(self, file: Path):
-        content = FileSys.read_file(file)
-        parsed = self.__try_parse(content)
-        result = self.__converter.convert(parsed.objects)
-        self.__filesys.save_to_shape_file(result, f'{file.stem}_{parsed.parser.UGMS_CODE}')
+    @staticmethod
+    def __output_name(file: Path, result: ConversionResult) -> str:
+        return f'{file.stem}_{result.parser.UGMS_CODE}'
+
+    def __task(self, file: Path) -> ConversionTask:
+        return ConversionTask(file=file,
+                              parsers=self.__parsers,
+                              template_path=self.__filesys.template_path,
+                              renames=self.__filesys.renames,
+                              null_symbol=self.__null_symbol,
+                              match_cache_path=self.__filesys.match_cache_path,
+                              template_cache_dir=self.__filesys.template_cache_dir,
+                              trace_memory=self.__trace_memory,
+                              profiling=self.__profiling,
+                              retry=self.__retry)
+
+    def __file_metrics(self, file: Path, result: ConversionResult) -> FileMetrics:
+        return FileMetrics(file=file.name, ugms_code=result.parser.UGMS_CODE, stages=list(result.stages),
+                           output_dir=str(self.__filesys.output_dir))
+
+    # Runs on the writer thread, the file is only recorded in the manifest once its output is written
+    def __save(self, manifest: RunManifest, file: Path, key: ManifestKey, result: ConversionResult,
+               metrics: RunMetrics) -> None:
+        if result.geodataframe is None:
+            self.__skip_empty(file, result, metrics)
+            return
+        profiler = FileProfiler.create(self.__profiling, file)
+        recorder = StageRecorder(self.__trace_memory, profiler)
+        try:
+            with recorder.stage('write'):
+                self.__retry.call(self.__filesys.save, result.geodataframe, self.__output_name(file, result),
+                                  BulletinSource.of(file, result.parser.UGMS_CODE))
+            self.__record(manifest, file, key, result)
+            self.__report_unmatched(file, result)
+        except Exception as error:
+            self.__fail(metrics, file, error, 'write')
+            return
+        finally:
+            if profiler is not None:
+                profiler.dump(merge=True)
+        file_metrics = self.__file_metrics(file, result)
+        file_metrics.stages.extend(recorder.stages)
+        metrics.files.append(file_metrics)
+
+    # A bulletin with an empty table has nothing to write. It stays out of the manifest, so it is converted again
+    # once the bulletin is filled in.
+    def __skip_empty(self, file: Path, result: ConversionResult, metrics: RunMetrics) -> None:
+        try:
+            self.__report_unmatched(file, result)
+        except Exception as error:
+            self.__fail(metrics, file, error, 'write')
+            return
+        if self.__logger is not None:
+            self.__logger.log_nowait(f'Нет постов для записи в {file.name}')
+        metrics.files.append(self.__file_metrics(file, result))
+
+    def __report_unmatched(self, file: Path, result: ConversionResult) -> None:
+        if self.__unmatched_report is not None:
+            path = self.__unmatched_report.write(self.__output_name(file, result), file, result.parser.UGMS_CODE,
+                                                 result.unmatched)
+            if path is not None and self.__logger is not None:
+                count = len(set(result.unmatched))
+                self.__logger.log_nowait(f'Не найдено постов: {count} в {file.name}, отчёт {path}')
+        elif self.__logger is not None:
+            for name, water_name in dict.fromkeys(result.unmatched):
+                self.__logger.log_nowait(f'Не найден {name} {water_name}')
+
+    def __process_all(self, files: list[Path]) -> Iterator[Callable[[], ConversionResult]]:
+        if self.__process_pool is None:
+            return (functools.partial(self.__process, file) for file in files)
+        futures = [self.__process_pool.submit(ConversionWorker.run, self.__task(file)) for file in files]
+        return (future.result for future in futures)
+
+    def __process(self, file: Path) -> ConversionResult:
+        profiler = FileProfiler.create(self.__profiling, file)
+        recorder = StageRecorder(self.__trace_memory, profiler)
+        try:
+            with recorder.stage('read'):
+                content = self.__retry.call(FileSys.read_file, file)
+            with recorder.stage('parse'):
+                parsed = self.__try_parse(content)
+            unmatched = list()
+            geodataframe = self.__converter.convert(parsed.objects, unmatched, recorder)
+        finally:
+            if profiler is not None:
+                profiler.dump()
+        return ConversionResult(parsed.parser, geodataframe, unmatched, tuple(recorder.stages))
+
+    # discover -> read -> parse and convert -> write. A file holds one of max_in_flight slots from the moment
+    # it is read until its output is written, so memory does not grow with the number of bulletins.
+    # With a process pool the workers read and convert, and max_in_flight of them are kept busy.
+    async def __run_pipeline(self, files: list[Path], manifest: RunManifest, metrics: RunMetrics, force: bool) -> None:
+        slots = asyncio.Semaphore(self.__max_in_flight)
+        discovered = asyncio.Queue(self.__max_in_flight)
+        async with asyncio.TaskGroup() as stages:
+            if self.__process_pool is None:
+                read = asyncio.Queue(self.__max_in_flight)
+                stages.create_task(self.__discover(files, manifest, metrics, force, slots, discovered, 1))
+                stages.create_task(self.__read_stage(discovered, read, metrics, slots))
+                stages.create_task(self.__convert_stage(read, manifest, metrics, slots))
+            else:
+                stages.create_task(self.__discover(files, manifest, metrics, force, slots, discovered,
+                                                   self.__max_in_flight))
+                for _ in range(self.__max_in_flight):
+                    stages.create_task(self.__convert_stage(discovered, manifest, metrics, slots))
+
+    async def __discover(self, files: list[Path], manifest: RunManifest, metrics: RunMetrics, force: bool,
+                         slots: asyncio.Semaphore, target: asyncio.Queue, consumers: int) -> None:
+        for file in files:
+            try:
+                key = await self.__retry.call_async(self.__manifest_key, manifest, file)
+            except Exception as error:
+                self.__fail(metrics, file, error)
+                continue
+            if not force and manifest.is_current(file, key):
+                continue
+            await slots.acquire()
+            await target.put(PipelineFile(file, key))
+        for _ in range(consumers):
+            await target.put(None)
+
+    # Reads on a thread, so the next bulletins are read while the current one is parsed on the loop
+    async def __read_stage(self, source: asyncio.Queue, target: asyncio.Queue, metrics: RunMetrics,
+                           slots: asyncio.Semaphore) -> None:
+        loop = asyncio.get_running_loop()
+        while (item := await source.get()) is not None:
+            item.profiler = FileProfiler.create(self.__profiling, item.file)
+            item.recorder = StageRecorder(self.__trace_memory, item.profiler)
+            try:
+                item.content = await loop.run_in_executor(None, self.__read, item)
+            except Exception as error:
+                self.__drop(item, metrics, slots, error)
+                continue
+            await target.put(item)
+        await target.put(None)
 
-    async def __convert_file_async(self, file: Path):
-        content = await FileSys.read_file_async(file)
-        parsed = await self.__try_parse_async(content)
-        result = await self.__converter.convert_async(parsed.objects)
-        # print(result)
-        self.__filesys.save_to_shape_file(result, f'{file.stem}_{parsed.parser.UGMS_CODE}')
+    def __read(self, item: PipelineFile) -> Any:
+        with item.recorder.stage('read'):
+            return self.__retry.call(FileSys.read_file, item.file)
 
-    def __try_parse(self, content) -> ParseResult:
-        for parser in self.__parsers:
+    async def __convert_stage(self, source: asyncio.Queue, manifest: RunManifest, metrics: RunMetrics,
+                              slots: asyncio.Semaphore) -> None:
+        while (item := await source.get()) is not None:
             try:
-                result = parser.parse(content)
-                return ParseResult(parser=parser, objects=result)
-            except ParseException:
-                pass
-        raise UnknownFormatException()
+                result = await self.__convert_item(item)
+            except Exception as error:
+                self.__drop(item, metrics, slots, error)
+                continue
+            future = await self.__writer_pool.submit(self.__save, manifest, item.file, item.key, result, metrics)
+            future.add_done_callback(lambda _: slots.release())
+
+    async def __convert_item(self, item: PipelineFile) -> ConversionResult:
+        if self.__process_pool is not None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.__process_pool, ConversionWorker.run, self.__task(item.file))
+        try:
+            with item.recorder.stage('parse'):
+                parsed = await self.__try_parse_async(item.content)
+            item.content = None
+            unmatched = list()
+            result = await self.__converter.convert_async(parsed.objects, unmatched, item.recorder)
+        finally:
+            self.__dump_profile(item)
+        return ConversionResult(parsed.parser, result, unmatched, tuple(item.recorder.stages))
+
+    def __drop(self, item: PipelineFile, metrics: RunMetrics, slots: asyncio.Semaphore, error: Exception) -> None:
+        self.__dump_profile(item)
+        item.content = None
+        self.__fail(metrics, item.file, error)
+        slots.release()
+
+    @staticmethod
+    def __dump_profile(item: PipelineFile) -> None:
+        if item.profiler is not None:
+            item.profiler.dump()
+            item.profiler = None
+
+    def __try_parse(self, content) -> ParseResult:
+        return ParseResult.parse(content, self.__parsers)
 
     async def __try_parse_async(self, content) -> ParseResult:
-        for parser in self.__parsers:
-            try:
-                result = await parser.parse_async(content)
-                return ParseResult(parser=parser, objects=result)
-            except ParseException:
-                pass
-        raise UnknownFormatException()
+        return await ParseResult.parse_async(content, self.__parsers)
 
 
 class Converter:
@@ -273,109 +696,134 @@ class Converter:
                  template: GeoDataFrame | None,
                  renames: dict[str, str] = None,
                  null_symbol: str = None,
-                 logger: Logger = None):
+                 logger: Logger = None,
+                 match_cache_path: Path | str = None,
+                 template_index: TemplateIndex = None):
         self.__template = template
         self.__renames = renames
         self.__null_symbol = null_symbol
         self.__logger = logger
-
-    async def convert_async(self, observation_stations: list[ObservationPointDTOBase]) -> GeoDataFrame:
-        return self.convert(observation_stations)
-
-    def convert(self, observation_stations: list[ObservationPointDTOBase]) -> GeoDataFrame | None:
-        if self.__renames is None:
-            observation_stations = self.__rename_experimental(observation_stations)
-        else:
-            observation_stations = self.__rename(observation_stations)
+        self.__template_index = template_index or self.__index_template(template)
+        self.__match_cache = None
+        if renames is None:
+            self.__load_match_cache(match_cache_path)
+
+    async def convert_async(self,
+                            observation_stations: ObservationBatch | list[ObservationPointDTOBase],
+                            unmatched: list[tuple[str, str]] = None,
+                            recorder: StageRecorder = None) -> GeoDataFrame:
+        return self.convert(observation_stations, unmatched, recorder)
+
+    def convert(self,
+                observation_stations: ObservationBatch | list[ObservationPointDTOBase],
+                unmatched: list[tuple[str, str]] = None,
+                recorder: StageRecorder = None) -> GeoDataFrame | None:
+        recorder = recorder or StageRecorder()
+        if not isinstance(observation_stations, ObservationBatch):
+            observation_stations = ObservationBatch.from_points(observation_stations)
+        with recorder.stage('rename'):
+            if self.__renames is None:
+                observation_stations = self.__rename_experimental(observation_stations)
+            else:
+                observation_stations = self.__rename(observation_stations)
         if len(observation_stations) == 0:
             return None
-        return self.__make_gdf(observation_stations)
-
-    def __make_gdf(self, observation_stations: list[ObservationPointDTOBase]) -> GeoDataFrame:
-        gdf = self.__make_template(some_point=observation_stations[0])
-        names_waters = list(zip(gdf[NameProperty.dataframe_name()], gdf[WaterNameProperty.dataframe_name()]))
-        for point in observation_stations:
-            for index, t_point in enumerate(names_waters):
-                if not (point.name in t_point and point.water_name in t_point):
-                    if index == len(names_waters) - 1:
-                        self.__log(point)
-                    continue
-                point_dict = point.to_dataframe_dict()
-                for field in point_dict:
-                    gdf[field][index] = point_dict[field]
-                break
-        self.__remove_useless_rows(gdf)
-        return geopandas.GeoDataFrame(gdf, geometry='geometry')
-
-    def __make_template(self, some_point: ObservationPointDTOBase):
-        gdf = self.__template.copy()
-        properties = [
-            prop
-            for prop in some_point.to_dataframe_dict()
-            if prop != WaterNameProperty.dataframe_name() and prop != NameProperty.dataframe_name()
-        ]
-        for prop in properties:
-            gdf[prop] = self.__null_symbol
-        return gdf
-
-    def __remove_useless_rows(self, table: GeoDataFrame) -> None:
+        with recorder.stage('join'):
+            return self.__make_gdf(observation_stations, unmatched)
+
+    def __make_gdf(self, observation_stations: ObservationBatch, unmatched: list[tuple[str, str]] | None) -> GeoDataFrame:
+        points = observation_stations.to_frame()
+        rows = self.__match_template_rows(observation_stations, unmatched)
+        matched = points[rows.notna()].set_index(rows.dropna().astype(int))
+        matched = matched[~matched.index.duplicated(keep='last')].sort_index()
+        gdf = self.__template.iloc[matched.index].copy()
+        for column in matched.columns:
+            gdf[column] = matched[column].to_numpy()
+        return self.__remove_useless_rows(gdf)
+
+    def __match_template_rows(self,
+                              observation_stations: ObservationBatch,
+                              unmatched: list[tuple[str, str]] | None) -> pandas.Series:
+        rows = list()
+        for name, water_name in zip(observation_stations.column('name'), observation_stations.column('water_name')):
+            row = self.__template_index.row_of(name, water_name)
+            if row is None:
+                if unmatched is None:
+                    self.__log(name, water_name)
+                else:
+                    unmatched.append((name, water_name))
+            rows.append(row)
+        return pandas.Series(rows, dtype=object)
+
+    def __remove_useless_rows(self, table: GeoDataFrame) -> GeoDataFrame:
         if self.__null_symbol is None:
-            return
-        levels_changes = zip(table[WaterLevelProperty.dataframe_name()],
-                             table[WaterLevelChangeProperty.dataframe_name()])
-        for index, point in reversed(list(enumerate(levels_changes))):
-            if not (point[0] == self.__null_symbol and point[1] == self.__null_symbol):
-                continue
-            table.drop(table.index[index], inplace=True)
-
-    def __rename(self, table: list[ObservationPointDTOBase]) -> list[ObservationPointDTOBase]:
-        for index, point in enumerate(table):
-            if point.name in self.__renames.keys():
-                table[index].name = self.__renames[point.name]
-            if point.water_name in self.__renames.keys():
-                table[index].water_name = self.__renames[point.water_name]
-        return table
+            return table
+        useless = ((table[WaterLevelProperty.dataframe_name()] == self.__null_symbol)
+                   & (table[WaterLevelChangeProperty.dataframe_name()] == self.__null_symbol))
+        return table[~useless]
 
-    def __rename_experimental(self, table: list[ObservationPointDTOBase]) -> list[ObservationPointDTOBase]:
+    @staticmethod
+    def __index_template(template: GeoDataFrame | None) -> TemplateIndex:
+        if template is None:
+            return TemplateIndex(list(), list())
+        return TemplateIndex(template[WaterNameProperty.dataframe_name()].tolist(),
+                             template[NameProperty.dataframe_name()].tolist())
 
-        waters = self.__template[WaterNameProperty.dataframe_name()].tolist()
-        names = self.__template[NameProperty.dataframe_name()].tolist()
+    def __load_match_cache(self, path: Path | str | None) -> None:
+        if path is None:
+            return
+        self.__match_cache = MatchCache(path, self.__template_index.fingerprint)
 
-        for point_i, point in enumerate(table):
+    def __rename(self, table: ObservationBatch) -> ObservationBatch:
+        table.set_column('name', [self.__renames.get(name, name) for name in table.column('name')])
+        table.set_column('water_name', [self.__renames.get(water, water) for water in table.column('water_name')])
+        return table
+
+    def __rename_experimental(self, table: ObservationBatch) -> ObservationBatch:
+        matches = dict()
+        for key in zip(table.column('name'), table.column('water_name')):
+            if key in matches:
+                continue
+            if self.__match_cache is not None and key in self.__match_cache:
+                matches[key] = self.__match_cache[key]
+            else:
+                matches[key] = self.__resolve_match(*key)
+                if self.__match_cache is not None:
+                    self.__match_cache[key] = matches[key]
+        if self.__match_cache is not None:
+            self.__match_cache.save()
+        renamed = [matches[key] or key for key in zip(table.column('name'), table.column('water_name'))]
+        table.set_column('name', [name for name, _ in renamed])
+        table.set_column('water_name', [water_name for _, water_name in renamed])
+        return table
 
-            water_match = self.__find_match(point.water_name, waters)
-            name_match = self.__find_match(point.name, names)
+    def __resolve_match(self, name: str, water_name: str) -> tuple[str, str] | None:
 
-            if name_match is not None and water_match is None:
-                water_match = self.__cross_column_search(name_match, names, point.water_name, waters)
-            elif name_match is None and water_match is not None:
-                name_match = self.__cross_column_search(water_match, waters, point.name, names)
+        index = self.__template_index
 
-            if water_match is not None and name_match is not None:
-                if water_match not in self.__get_values_by_indices(self.__get_value_indices(name_match, names), waters):
-                    name_match = self.__cross_column_search(water_match, waters, point.name, names)
+        water_match = self.__find_match(water_name, index.waters.candidates(water_name))
+        name_match = self.__find_match(name, index.names.candidates(name))
 
-            if water_match is not None and name_match is not None:
-                if name_match not in self.__get_values_by_indices(self.__get_value_indices(water_match, waters), names):
-                    water_match = self.__cross_column_search(name_match, names, point.water_name, waters)
+        if name_match is not None and water_match is None:
+            water_match = self.__find_match(water_name, index.waters_of(name_match))
+        elif name_match is None and water_match is not None:
+            name_match = self.__find_match(name, index.names_of(water_match))
 
-            if water_match is not None and name_match is not None:
-                table[point_i].name = name_match
-                table[point_i].water_name = water_match
+        if water_match is not None and name_match is not None:
+            if water_match not in index.waters_of(name_match):
+                name_match = self.__find_match(name, index.names_of(water_match))
 
-        return table
+        if water_match is not None and name_match is not None:
+            if name_match not in index.names_of(water_match):
+                water_match = self.__find_match(water_name, index.waters_of(name_match))
 
-    @classmethod
-    def __cross_column_search(cls, anchor: str,
-                              possible_anchors: list[str],
-                              value: str,
-                              possible_values: list[str]) -> str | None:
-        indices = cls.__get_value_indices(anchor, possible_anchors)
-        return cls.__find_match(value, cls.__get_values_by_indices(indices, possible_values))
+        if water_match is not None and name_match is not None:
+            return name_match, water_match
+        return None
 
     # Uses binary search-like algorithm
     @classmethod
-    def __find_match(cls, word: str, possibilities: list[str]) -> str | None:
+    def __find_match(cls, word: str, possibilities: list[str] | frozenset[str]) -> str | None:
         threshold = 0.5
         accel = 0.25
         matches = set(difflib.get_close_matches(word, possibilities, cutoff=0.1))
@@ -395,22 +843,7 @@ class Converter:
                 return None
         return next(iter(matches))
 
-    @classmethod
-    def __get_value_indices(cls, value: str, in_values: list[str]) -> list[int]:
-        indices = list()
-        for lvi, list_value in enumerate(in_values):
-            if value == list_value:
-                indices.append(lvi)
-        return indices
-
-    @classmethod
-    def __get_values_by_indices(cls, indices: list[int], in_values: list[str]) -> list[str]:
-        values = list()
-        for index in indices:
-            values.append(in_values[index])
-        return values
-
-    def __log(self, point: ObservationPointDTOBase) -> None:
+    def __log(self, name: str, water_name: str) -> None:
         if self.__logger is None:
             return
-        asyncio.ensure_future(self.__logger.log(f'Не найден {point.name} {point.water_name}'))
+        self.__logger.log_nowait(f'Не найден {name} {water_name}')
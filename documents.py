@@ -0,0 +1,102 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from exceptions import *
+
+
+class DocConverterBackend(ABC):
+
+    @abstractmethod
+    def convert(self, file_path: Path) -> bytes:
+        pass
+
+
+class WordBackend(DocConverterBackend):
+
+    __DOCX_FORMAT = 16
+
+    def convert(self, file_path: Path) -> bytes:
+        import win32com.client
+        word_app = win32com.client.Dispatch('Word.Application')
+        temp_file = tempfile.NamedTemporaryFile(suffix='.docx', delete=False)
+        temp_file_path = temp_file.name
+        temp_file.close()
+        try:
+            doc = word_app.Documents.Open(str(file_path.resolve()))
+            doc.SaveAs(temp_file_path, FileFormat=self.__DOCX_FORMAT)
+            doc.Close()
+            with open(temp_file_path, 'rb') as f:
+                return f.read()
+        except Exception as e:
+            raise DocConversionException() from e
+        finally:
+            word_app.Quit()
+            os.remove(temp_file_path)
+
+
+class LibreOfficeBackend(DocConverterBackend):
+
+    # soffice instances that share a user profile block each other or fail, so every process gets its own profile and
+    # the calls within a process take turns
+    __profiles: dict[int, tempfile.TemporaryDirectory] = dict()
+    __lock = threading.Lock()
+
+    def __init__(self, executable: str = 'soffice', timeout: float = 120):
+        self.__executable = executable
+        self.__timeout = timeout
+
+    def convert(self, file_path: Path) -> bytes:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with self.__lock:
+                command = [self.__executable, f'-env:UserInstallation={self.__profile_uri()}', '--headless',
+                           '--convert-to', 'docx', '--outdir', temp_dir, str(file_path)]
+                try:
+                    subprocess.run(command, check=True, capture_output=True, timeout=self.__timeout)
+                except (OSError, subprocess.SubprocessError) as e:
+                    raise DocConversionException() from e
+            converted = Path(temp_dir).joinpath(f'{file_path.stem}.docx')
+            if not converted.exists():
+                raise DocConversionException()
+            return converted.read_bytes()
+
+    # Called under the lock
+    @classmethod
+    def __profile_uri(cls) -> str:
+        pid = os.getpid()
+        if pid not in cls.__profiles:
+            cls.__profiles[pid] = tempfile.TemporaryDirectory(prefix='soffice-profile-')
+        return Path(cls.__profiles[pid].name).as_uri()
+
+
+class DocConversionCache:
+
+    def __init__(self, cache_dir: Path | str, backend: DocConverterBackend = None):
+        self.__cache_dir = Path(cache_dir)
+        self.__backend = backend or self.__default_backend()
+
+    def convert(self, file_path: Path) -> bytes:
+        digest = hashlib.sha256(file_path.read_bytes()).hexdigest()
+        cached_path = self.__cache_dir.joinpath(f'{digest}.docx')
+        if cached_path.exists():
+            return cached_path.read_bytes()
+        content = self.__backend.convert(file_path)
+        self.__store(cached_path, content)
+        return content
+
+    def __store(self, cached_path: Path, content: bytes) -> None:
+        self.__cache_dir.mkdir(parents=True, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=self.__cache_dir, suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(content)
+        os.replace(temp_path, cached_path)
+
+    @staticmethod
+    def __default_backend() -> DocConverterBackend:
+        if os.name == 'nt':
+            return WordBackend()
+        return LibreOfficeBackend(shutil.which('soffice') or shutil.which('libreoffice') or 'soffice')
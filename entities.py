@@ -1,7 +1,13 @@
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
+from typing import Iterator, Sequence
 import dataclasses
+import functools
+import inspect
 import json
+import sys
+import numpy
+import pandas
 
 
 @dataclass
@@ -86,6 +92,15 @@ class ObservationPointDTOBase(
     def to_dataframe_dict(self) -> dict[str, str]:
         pass
 
+    @classmethod
+    @functools.cache
+    def dataframe_fields(cls) -> dict[str, str]:
+        if inspect.isabstract(cls):
+            return {NameProperty.dataframe_name(): 'name', WaterNameProperty.dataframe_name(): 'water_name'}
+        # Filling every field with its own name maps each dataframe column back to the field in output order
+        field_names = {field.name: field.name for field in dataclasses.fields(cls)}
+        return cls(**field_names).to_dataframe_dict()
+
 
 @dataclass
 class ZSObservationPointDTO(
@@ -194,8 +209,90 @@ class OIObservationPointDTO(
         return ddict
 
 
+class ObservationBatch:
+
+    __INTERNED_FIELDS = ('name', 'water_name')
+
+    def __init__(self, point_type: type[ObservationPointDTOBase], columns: dict[str, Sequence[str]]):
+        self.__point_type = point_type
+        self.__columns = dict()
+        for field in point_type.dataframe_fields().values():
+            self.set_column(field, columns[field])
+        lengths = {len(column) for column in self.__columns.values()}
+        if len(lengths) > 1:
+            raise ValueError('Observation batch columns have different lengths')
+        self.__length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_points(cls, points: list[ObservationPointDTOBase],
+                    point_type: type[ObservationPointDTOBase] = None) -> 'ObservationBatch':
+        if point_type is None:
+            point_type = type(points[0]) if points else ObservationPointDTOBase
+        fields = point_type.dataframe_fields().values()
+        return cls(point_type, {field: [getattr(point, field) for point in points] for field in fields})
+
+    @property
+    def point_type(self) -> type[ObservationPointDTOBase]:
+        return self.__point_type
+
+    @property
+    def fields(self) -> list[str]:
+        return list(self.__columns)
+
+    # Parsers may hand over numpy string arrays, they become object arrays of str only when a column is first used
+    def column(self, field: str) -> numpy.ndarray:
+        column = self.__columns[field]
+        if column.dtype.kind == 'U':
+            column = self.__objects(field, column.tolist())
+            self.__columns[field] = column
+        return column
+
+    def set_column(self, field: str, values: Sequence[str]) -> None:
+        if isinstance(values, numpy.ndarray) and values.dtype.kind == 'U':
+            self.__columns[field] = values
+        else:
+            self.__columns[field] = self.__objects(field, values)
+
+    @classmethod
+    def __objects(cls, field: str, values: Sequence[str]) -> numpy.ndarray:
+        if field in cls.__INTERNED_FIELDS:
+            values = cls.__intern(values)
+        column = numpy.empty(len(values), dtype=object)
+        column[:] = values
+        return column
+
+    @staticmethod
+    def __intern(values: Sequence[str]) -> list[str]:
+        try:
+            return list(map(sys.intern, values))
+        except TypeError:
+            return [sys.intern(value) if isinstance(value, str) else value for value in values]
+
+    def to_frame(self) -> pandas.DataFrame:
+        columns = {
+            dataframe_name: self.column(field)
+            for dataframe_name, field in self.__point_type.dataframe_fields().items()
+        }
+        return pandas.DataFrame(columns, copy=False, dtype=object)
+
+    def to_points(self) -> list[ObservationPointDTOBase]:
+        return list(self)
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def __getitem__(self, index: int) -> ObservationPointDTOBase:
+        return self.__point_type(**{field: self.column(field)[index] for field in self.__columns})
+
+    def __iter__(self) -> Iterator[ObservationPointDTOBase]:
+        for index in range(self.__length):
+            yield self[index]
+
+
 class DataclassJSONEncoder(json.JSONEncoder):
     def default(self, o):
+        if isinstance(o, ObservationPointDTOBase):
+            return {field: getattr(o, field) for field in type(o).dataframe_fields().values()}
         if dataclasses.is_dataclass(o):
             return dataclasses.asdict(o)
         return super().default(o)
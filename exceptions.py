@@ -1,10 +1,14 @@
-class ParseException(BaseException):
+class ParseException(Exception):
 
     _MESSAGE = 'Parsing exception'
 
     def __init__(self):
         super().__init__(self._MESSAGE)
 
+    # Subclasses take no arguments, so the message is not passed back when unpickled from a worker process
+    def __reduce__(self):
+        return self.__class__, (), self.__dict__
+
 
 class ParseZSException(ParseException):
 
@@ -46,21 +50,27 @@ class UnknownFormatException(ParseZSException):
         super().__init__()
 
 
-class ConverterAppException(BaseException):
+class ConverterAppException(Exception):
 
     _MESSAGE = 'Error in main conversion module'
 
     def __init__(self):
         super().__init__(self._MESSAGE)
 
+    def __reduce__(self):
+        return self.__class__, (), self.__dict__
+
 
-class FileSysException(BaseException):
+class FileSysException(Exception):
 
     _MESSAGE = 'File system exception'
 
     def __init__(self):
         super().__init__(self._MESSAGE)
 
+    def __reduce__(self):
+        return self.__class__, (), self.__dict__
+
 
 class MissingDefaultPrjException(FileSysException):
 
@@ -94,3 +104,19 @@ class MissingTemplateException(FileSysException):
 
     def __init__(self):
         super().__init__()
+
+
+class DocConversionException(FileSysException):
+
+    _MESSAGE = 'Could not convert .doc file to .docx'
+
+    def __init__(self):
+        super().__init__()
+
+
+class InvalidJobManifestException(ConverterAppException):
+
+    _MESSAGE = 'Job manifest is invalid or references unknown parsers'
+
+    def __init__(self):
+        super().__init__()
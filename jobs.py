@@ -0,0 +1,207 @@
+import asyncio
+import dataclasses
+import json
+import tomllib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Type
+from converter import *
+
+
+class RenameMode(Enum):
+    RENAMES = 'renames'
+    EXPERIMENTAL = 'experimental'
+
+
+PARSERS: dict[str, Type[UGMSParserBase]] = {
+    parser.UGMS_CODE: parser for parser in (ParserZS, ParserB, ParserZB, ParserI, ParserOI)
+}
+
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    parsers: tuple[Type[UGMSParserBase], ...]
+    input_dir: Path
+    output_dir: Path
+    template_path: Path
+    rename_mode: RenameMode = RenameMode.EXPERIMENTAL
+    renames_path: Path | None = None
+    prj_path: Path | None = None
+    null_symbol: str | None = None
+    output_format: OutputFormat = OutputFormat.SHAPEFILE
+    bundle_output: bool = False
+    unmatched_report: ReportFormat | None = ReportFormat.CSV
+
+    def create_app(self,
+                   logger: Logger = None,
+                   writer_pool: WriterPool = None,
+                   process_pool: ProcessPoolExecutor = None,
+                   trace_memory: bool = False,
+                   profiling: ProfilingOptions = None,
+                   retry: RetryPolicy = RetryPolicy(),
+                   max_in_flight: int = 4) -> ConverterApp:
+        filesys = FileSys(self.input_dir,
+                          self.output_dir,
+                          self.prj_path,
+                          self.renames_path if self.rename_mode is RenameMode.RENAMES else None,
+                          self.template_path,
+                          self.output_format,
+                          self.bundle_output)
+        return ConverterApp(filesys, self.null_symbol, logger, *self.parsers,
+                            writer_pool=writer_pool,
+                            process_pool=process_pool,
+                            trace_memory=trace_memory,
+                            profiling=profiling,
+                            unmatched_report=self.unmatched_report,
+                            retry=retry,
+                            max_in_flight=max_in_flight)
+
+
+class JobManifest:
+
+    __EXPERIMENTAL_SUFFIX = '_exp'
+
+    def __init__(self, jobs: list[Job], workers: int = 0, max_pending_writes: int = 4,
+                 retry: RetryPolicy = RetryPolicy(), max_in_flight: int = 4):
+        self.__jobs = jobs
+        self.__workers = workers
+        self.__max_pending_writes = max_pending_writes
+        self.__retry = retry
+        self.__max_in_flight = max_in_flight
+        output_dirs = [job.output_dir.resolve() for job in jobs]
+        if len(set(output_dirs)) != len(output_dirs):
+            raise InvalidJobManifestException()
+
+    @property
+    def jobs(self) -> list[Job]:
+        return self.__jobs
+
+    @property
+    def workers(self) -> int:
+        return self.__workers
+
+    @classmethod
+    def load(cls, path: Path | str) -> 'JobManifest':
+        path = Path(path)
+        try:
+            if path.suffix == '.toml':
+                with open(path, 'rb') as file:
+                    data = tomllib.load(file)
+            else:
+                with open(path, 'r', encoding='utf-8') as file:
+                    data = json.load(file)
+        except ValueError:
+            raise InvalidJobManifestException()
+        return cls.from_dict(data, path.parent)
+
+    @classmethod
+    def from_dict(cls, data: dict, base_dir: Path) -> 'JobManifest':
+        try:
+            jobs = [job for region in data['regions'] for job in cls.__region_jobs(region, data, base_dir)]
+            retry = RetryPolicy(attempts=int(data.get('retry_attempts', RetryPolicy.attempts)),
+                                delay=float(data.get('retry_delay', RetryPolicy.delay)))
+            return cls(jobs, int(data.get('workers', 0)), int(data.get('max_pending_writes', 4)), retry,
+                       int(data.get('max_in_flight', 4)))
+        except (KeyError, ValueError, TypeError, AttributeError):
+            raise InvalidJobManifestException()
+
+    def select(self, names: list[str]) -> 'JobManifest':
+        regions = {name.lower() for name in names}
+        jobs = [job for job in self.__jobs
+                if job.name.lower() in regions or job.name.lower().removesuffix(self.__EXPERIMENTAL_SUFFIX) in regions]
+        return JobManifest(jobs, self.__workers, self.__max_pending_writes, self.__retry, self.__max_in_flight)
+
+    async def run_async(self,
+                        logger: Logger = None,
+                        force: bool = False,
+                        workers: int = None,
+                        trace_memory: bool = False,
+                        profiling: ProfilingOptions = None) -> RunMetrics:
+        workers = self.__workers if workers is None else workers
+        writer_pool = WriterPool(max_pending=self.__max_pending_writes)
+        process_pool = ProcessPoolExecutor(workers) if workers > 0 else None
+        try:
+            metrics = RunMetrics()
+            apps = list()
+            for job in self.__jobs:
+                try:
+                    apps.append((job, job.create_app(logger, writer_pool, process_pool, trace_memory,
+                                                     self.__job_profiling(profiling, job), self.__retry,
+                                                     self.__max_in_flight)))
+                except Exception as error:
+                    self.__fail(metrics, logger, job, error, 'setup')
+            runs = await asyncio.gather(*(app.convert_async(force) for _, app in apps), return_exceptions=True)
+            for (job, _), run in zip(apps, runs):
+                if isinstance(run, RunMetrics):
+                    metrics = RunMetrics.merge([metrics, run])
+                elif isinstance(run, Exception):
+                    self.__fail(metrics, logger, job, run, 'run')
+                else:
+                    raise run
+            return metrics
+        finally:
+            if process_pool is not None:
+                process_pool.shutdown()
+            writer_pool.close()
+
+    # One region with a missing input dir or a broken template must not stop the others
+    @staticmethod
+    def __fail(metrics: RunMetrics, logger: Logger | None, job: Job, error: Exception, stage: str) -> None:
+        metrics.failures.append(FileFailure.of(job.name, error, stage))
+        if logger is not None:
+            logger.log_nowait(f'Задание {job.name} не выполнено: {error}')
+
+    # Jobs of one region read the same bulletins, so each job profiles into its own directory
+    @staticmethod
+    def __job_profiling(profiling: ProfilingOptions | None, job: Job) -> ProfilingOptions | None:
+        if profiling is None:
+            return None
+        return dataclasses.replace(profiling, directory=profiling.directory.joinpath(job.name))
+
+    @classmethod
+    def __region_jobs(cls, region: dict, defaults: dict, base_dir: Path) -> list[Job]:
+        name = region['name']
+        settings = {**defaults, **region}
+        renames_path = cls.__path(base_dir, settings.get('renames'))
+        default_modes = [RenameMode.RENAMES.value, RenameMode.EXPERIMENTAL.value] if renames_path else \
+            [RenameMode.EXPERIMENTAL.value]
+        modes = [RenameMode(mode) for mode in settings.get('modes', default_modes)]
+        if RenameMode.RENAMES in modes and renames_path is None:
+            raise ValueError(name)
+        output_dir = cls.__path(base_dir, region['output'])
+        experimental_output_dir = cls.__path(base_dir, region.get('experimental_output'))
+        if experimental_output_dir is None:
+            experimental_output_dir = output_dir if RenameMode.RENAMES not in modes else \
+                output_dir.with_name(output_dir.name + cls.__EXPERIMENTAL_SUFFIX)
+        jobs = list()
+        for mode in modes:
+            experimental = mode is RenameMode.EXPERIMENTAL and len(modes) > 1
+            jobs.append(Job(
+                name=name + cls.__EXPERIMENTAL_SUFFIX if experimental else name,
+                parsers=tuple(PARSERS[code.upper()] for code in settings.get('parsers', [name])),
+                input_dir=cls.__path(base_dir, region['input']),
+                output_dir=experimental_output_dir if mode is RenameMode.EXPERIMENTAL else output_dir,
+                template_path=cls.__path(base_dir, settings['template']),
+                rename_mode=mode,
+                renames_path=renames_path,
+                prj_path=cls.__path(base_dir, settings.get('prj')),
+                null_symbol=settings.get('null_symbol'),
+                output_format=OutputFormat(settings.get('output_format', OutputFormat.SHAPEFILE.value)),
+                bundle_output=bool(settings.get('bundle', False)),
+                unmatched_report=cls.__report_format(settings.get('unmatched_report', ReportFormat.CSV.value))))
+        return jobs
+
+    @staticmethod
+    def __report_format(value: str | bool) -> ReportFormat | None:
+        if value is False or value == 'none':
+            return None
+        return ReportFormat(value)
+
+    @staticmethod
+    def __path(base_dir: Path, value: str | None) -> Path | None:
+        if value is None:
+            return None
+        return base_dir.joinpath(Path(value).expanduser())
@@ -1,91 +1,53 @@
+import argparse
 from converter import *
-
-
-async def main():
-    logger = AsyncConsoleLogger()
-
-    filesys = FileSys('C:\\Users\\radia\\PycharmProjects\\pythonProject\\tests\\test_files\\zs\\Input',
-                      'C:\\Users\\radia\\PycharmProjects\\pythonProject\\tests\\test_files\\zs\\Output',
-                      None,
-                      'C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\ChangeName_ZapSib.csv',
-                      'C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Гидропосты_правл_Зап_Сиб\\Гидропосты.shp')
-
-    filesys_exp = FileSys('C:\\Users\\radia\\PycharmProjects\\pythonProject\\tests\\test_files\\zs\\Input',
-                          'C:\\Users\\radia\\PycharmProjects\\pythonProject\\tests\\test_files\\zs\\Output_exp',
-                          None,
-                          None,
-                          'C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Гидропосты_правл_Зап_Сиб\\Гидропосты.shp')
-
-    filesys_b = FileSys('C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Бурятское УГМС\\Input',
-                        'C:\\Users\\radia\\PycharmProjects\\pythonProject\\tests\\test_files\\b\\Output',
-                        None,
-                        'C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\ChangeName_ZapSib.csv',
-                        'C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Гидропосты_правл_Зап_Сиб\\Гидропосты.shp')
-
-    filesys_b_exp = FileSys('C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Бурятское УГМС\\Input',
-                            'C:\\Users\\radia\\PycharmProjects\\pythonProject\\tests\\test_files\\b\\Output',
-                            None,
-                            None,
-                            'C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Гидропосты_правл_Зап_Сиб\\Гидропосты.shp')
-
-    filesys_zb = FileSys('C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Забайкальское УГМС\\Input',
-                         'C:\\Users\\radia\\PycharmProjects\\pythonProject\\tests\\test_files\\zb\\Output',
-                         None,
-                         'C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\ChangeName_ZapSib.csv',
-                         'C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Гидропосты_правл_Зап_Сиб\\Гидропосты.shp')
-
-    filesys_zb_exp = FileSys('C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Забайкальское УГМС\\Input',
-                             'C:\\Users\\radia\\PycharmProjects\\pythonProject\\tests\\test_files\\zb\\Output',
-                             None,
-                             None,
-                             'C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Гидропосты_правл_Зап_Сиб\\Гидропосты.shp')
-
-    filesys_i = FileSys('C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Иркутское УГМС\\Input',
-                        'C:\\Users\\radia\\PycharmProjects\\pythonProject\\tests\\test_files\\i\\Output',
-                        None,
-                        'C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\ChangeName_ZapSib.csv',
-                        'C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Гидропосты_правл_Зап_Сиб\\Гидропосты.shp')
-
-    filesys_i_exp = FileSys('C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Иркутское УГМС\\Input',
-                            'C:\\Users\\radia\\PycharmProjects\\pythonProject\\tests\\test_files\\i\\Output',
-                            None,
-                            None,
-                            'C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Гидропосты_правл_Зап_Сиб\\Гидропосты.shp')
-
-    filesys_oi = FileSys('C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Обь-Иртышское УГМС\\Input',
-                         'C:\\Users\\radia\\PycharmProjects\\pythonProject\\tests\\test_files\\oi\\Output',
-                         None,
-                         None,
-                         'C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Гидропосты_правл_Зап_Сиб\\Гидропосты.shp')
-
-    filesys_oi_exp = FileSys('C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Обь-Иртышское УГМС\\Input',
-                             'C:\\Users\\radia\\PycharmProjects\\pythonProject\\tests\\test_files\\oi\\Output',
-                             None,
-                             None,
-                             'C:\\Users\\radia\\OneDrive\\Рабочий стол\\Планета\\Гидропосты_правл_Зап_Сиб\\Гидропосты.shp')
-
-    converter_app_zs = ConverterApp(filesys, '-', logger, ParserZS)
-    converter_app_zs_exp = ConverterApp(filesys_exp, '-', logger, ParserZS)
-    converter_app_b = ConverterApp(filesys_b, '-', logger, ParserB)
-    converter_app_b_exp = ConverterApp(filesys_b_exp, '-', logger, ParserB)
-    converter_app_zb = ConverterApp(filesys_zb, '-', logger, ParserZB)
-    converter_app_zb_exp = ConverterApp(filesys_zb_exp, '-', logger, ParserZB)
-    converter_app_i = ConverterApp(filesys_i, '-', logger, ParserI)
-    converter_app_i_exp = ConverterApp(filesys_i_exp, '-', logger, ParserI)
-    converter_app_oi = ConverterApp(filesys_oi, '-', logger, ParserOI)
-    converter_app_oi_exp = ConverterApp(filesys_oi_exp, '-', logger, ParserOI)
-
-    # await converter_app_zs.convert_async()
-    # await converter_app_zs_exp.convert_async()
-    # await converter_app_b.convert_async()
-    # await converter_app_b_exp.convert_async()
-    await converter_app_zb.convert_async()
-    await converter_app_zb_exp.convert_async()
-    # await converter_app_i.convert_async()
-    # await converter_app_i_exp.convert_async()
-    # await converter_app_oi.convert_async()
-    # await converter_app_oi_exp.convert_async()
+from jobs import *
+
+
+def parse_args(args: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Конвертация бюллетеней УГМС по списку заданий')
+    parser.add_argument('manifest', type=Path, help='файл заданий (.toml или .json)')
+    parser.add_argument('--only', nargs='+', metavar='REGION', help='выполнить только указанные регионы')
+    parser.add_argument('--workers', type=int, default=None, help='число процессов для разбора и конвертации')
+    parser.add_argument('--force', action='store_true', help='конвертировать даже неизменённые файлы')
+    parser.add_argument('--log-file', type=Path, default=None, help='дублировать журнал в файл с ротацией')
+    parser.add_argument('--metrics', type=Path, default=None,
+                        help='файл для метрик по этапам (.prom - формат Prometheus, иначе JSON Lines)')
+    parser.add_argument('--trace-memory', action='store_true', help='замерять пик памяти этапов через tracemalloc')
+    parser.add_argument('--profile', type=Path, default=None, metavar='DIR',
+                        help='сохранять .pstats и .collapsed для каждого файла в папку')
+    parser.add_argument('--profile-files', nargs='+', default=(), metavar='PATTERN',
+                        help='профилировать только файлы, подходящие под шаблоны')
+    parser.add_argument('--profile-stages', nargs='+', default=(), metavar='STAGE',
+                        choices=('read', 'parse', 'rename', 'join', 'write'), help='профилировать только этапы')
+    parser.add_argument('--sample-interval', type=float, default=None, metavar='SECONDS',
+                        help='снимать стеки с указанным интервалом для flamegraph')
+    return parser.parse_args(args)
+
+
+def profiling_options(options: argparse.Namespace) -> ProfilingOptions | None:
+    if options.profile is None:
+        return None
+    return ProfilingOptions(directory=options.profile,
+                            files=tuple(options.profile_files),
+                            stages=tuple(options.profile_stages),
+                            sample_interval=options.sample_interval)
+
+
+async def main(args: list[str] = None) -> int:
+    options = parse_args(args)
+    manifest = JobManifest.load(options.manifest)
+    if options.only:
+        manifest = manifest.select(options.only)
+    logger = BufferedLogger(file_path=options.log_file)
+    try:
+        metrics = await manifest.run_async(logger, options.force, options.workers, options.trace_memory,
+                                           profiling_options(options))
+    finally:
+        logger.close()
+    if options.metrics is not None:
+        metrics.export(options.metrics)
+    return 1 if metrics.failures else 0
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,83 @@
+import dataclasses
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass(frozen=True)
+class ManifestKey:
+    content_hash: str
+    parsers: str
+    template_fingerprint: str
+    rename_fingerprint: str
+    null_symbol: str | None
+    output_format: str
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    key: ManifestKey
+    size: int
+    mtime_ns: int
+    parser: str
+    output_path: str | None
+
+
+class RunManifest:
+
+    FILE_NAME = 'manifest.json'
+
+    def __init__(self, output_dir: Path):
+        self.__path = output_dir.joinpath(self.FILE_NAME)
+        self.__entries = self.__read()
+
+    @staticmethod
+    def fingerprint(value) -> str:
+        return hashlib.sha256(json.dumps(value, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def content_hash(self, file: Path) -> str:
+        stat = file.stat()
+        entry = self.__entries.get(self.__input_key(file))
+        if entry is not None and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+            return entry.key.content_hash
+        return hashlib.sha256(file.read_bytes()).hexdigest()
+
+    def is_current(self, file: Path, key: ManifestKey) -> bool:
+        entry = self.__entries.get(self.__input_key(file))
+        if entry is None or entry.key != key:
+            return False
+        return entry.output_path is not None and Path(entry.output_path).exists()
+
+    def record(self, file: Path, key: ManifestKey, parser: str, output_path: Path | None) -> None:
+        stat = file.stat()
+        self.__entries[self.__input_key(file)] = ManifestEntry(
+            key=key,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            parser=parser,
+            output_path=None if output_path is None else str(output_path))
+
+    def save(self) -> None:
+        entries = {file: dataclasses.asdict(entry) for file, entry in self.__entries.items()}
+        descriptor, temp_path = tempfile.mkstemp(dir=self.__path.parent, suffix='.tmp')
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+            json.dump(entries, file, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.__path)
+
+    @staticmethod
+    def __input_key(file: Path) -> str:
+        return str(file.resolve())
+
+    def __read(self) -> dict[str, ManifestEntry]:
+        try:
+            with open(self.__path, 'r', encoding='utf-8') as file:
+                entries = json.load(file)
+            return {
+                input_file: ManifestEntry(**{**entry, 'key': ManifestKey(**entry['key'])})
+                for input_file, entry in entries.items()
+            }
+        except (OSError, ValueError, TypeError, KeyError):
+            return dict()
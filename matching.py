@@ -0,0 +1,192 @@
+import hashlib
+import heapq
+import json
+import os
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:
+    import msvcrt
+
+
+class NGramIndex:
+
+    def __init__(self, values: Iterable[str], size: int = 3, limit: int = 12):
+        self.__size = size
+        self.__limit = limit
+        self.__values = list(dict.fromkeys(value for value in values if isinstance(value, str)))
+        self.__gram_counts = list()
+        self.__postings: dict[str, list[int]] = dict()
+        for value_id, value in enumerate(self.__values):
+            grams = self.__grams(value)
+            self.__gram_counts.append(len(grams))
+            for gram in grams:
+                self.__postings.setdefault(gram, []).append(value_id)
+
+    @property
+    def values(self) -> list[str]:
+        return self.__values
+
+    # A word sharing no gram with any value, e.g. a short or badly misspelled name, is still compared with every value
+    def candidates(self, word: str) -> list[str]:
+        grams = self.__grams(word)
+        hits = Counter()
+        for gram in grams:
+            hits.update(self.__postings.get(gram, ()))
+        if not hits:
+            return self.__values
+        best = heapq.nlargest(self.__limit, hits.items(), key=lambda hit: self.__score(hit, len(grams)))
+        return [self.__values[value_id] for value_id, _ in best]
+
+    def __score(self, hit: tuple[int, int], word_grams: int) -> float:
+        value_id, shared = hit
+        return 2 * shared / (word_grams + self.__gram_counts[value_id])
+
+    def __grams(self, value: str) -> set[str]:
+        padded = f' {value.lower()} '
+        return {padded[i:i + self.__size] for i in range(max(1, len(padded) - self.__size + 1))}
+
+
+class TemplateIndex:
+
+    def __init__(self, waters: list[str], names: list[str]):
+        self.__water_values = waters
+        self.__name_values = names
+        self.__waters = None
+        self.__names = None
+        self.__rows = self.__index_rows(waters, names)
+        self.__names_by_water = self.__group(waters, names)
+        self.__waters_by_name = self.__group(names, waters)
+        self.__fingerprint = MatchCache.fingerprint(waters, names)
+
+    @property
+    def waters(self) -> NGramIndex:
+        if self.__waters is None:
+            self.__waters = NGramIndex(self.__water_values)
+        return self.__waters
+
+    @property
+    def names(self) -> NGramIndex:
+        if self.__names is None:
+            self.__names = NGramIndex(self.__name_values)
+        return self.__names
+
+    @property
+    def fingerprint(self) -> str:
+        return self.__fingerprint
+
+    def row_of(self, name: str, water: str) -> int | None:
+        return self.__rows.get((name, water))
+
+    def names_of(self, water: str) -> frozenset[str]:
+        return self.__names_by_water.get(water, frozenset())
+
+    def waters_of(self, name: str) -> frozenset[str]:
+        return self.__waters_by_name.get(name, frozenset())
+
+    @staticmethod
+    def __index_rows(waters: list[str], names: list[str]) -> dict[tuple[str, str], int]:
+        rows = dict()
+        # A point matches a row when both its name and water name are among the row's two values
+        for position, (name, water) in enumerate(zip(names, waters)):
+            for key in ((name, water), (water, name), (name, name), (water, water)):
+                rows.setdefault(key, position)
+        return rows
+
+    @staticmethod
+    def __group(keys: list[str], values: list[str]) -> dict[str, frozenset[str]]:
+        groups = dict()
+        for key, value in zip(keys, values):
+            groups.setdefault(key, set()).add(value)
+        return {key: frozenset(group) for key, group in groups.items()}
+
+
+class MatchCache:
+
+    __KEY_SEPARATOR = '\x1f'
+
+    def __init__(self, path: Path | str, fingerprint: str, max_sections: int = 8):
+        self.__path = Path(path)
+        self.__fingerprint = fingerprint
+        self.__max_sections = max(1, max_sections)
+        self.__entries = self.__read().get(fingerprint, dict())
+        self.__changed = dict()
+
+    @classmethod
+    def fingerprint(cls, waters: list[str], names: list[str]) -> str:
+        digest = hashlib.sha256()
+        for value in waters + names:
+            digest.update(str(value).encode('utf-8'))
+            digest.update(cls.__KEY_SEPARATOR.encode('utf-8'))
+        return digest.hexdigest()
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return self.__key(key) in self.__entries
+
+    def __getitem__(self, key: tuple[str, str]) -> tuple[str, str] | None:
+        match = self.__entries[self.__key(key)]
+        return None if match is None else tuple(match)
+
+    def __setitem__(self, key: tuple[str, str], match: tuple[str, str] | None) -> None:
+        key = self.__key(key)
+        self.__entries[key] = None if match is None else list(match)
+        self.__changed[key] = self.__entries[key]
+
+    # Workers of the process pool save into the same file, the lock keeps them from losing each other's matches.
+    # Sections are kept from the least to the most recently saved one, so switching back to an earlier template finds
+    # its matches, and the oldest ones are dropped past max_sections, so the file does not grow with every template edit.
+    def save(self) -> None:
+        if not self.__changed:
+            return
+        with _locked(self.__path.with_name(self.__path.name + '.lock')):
+            sections = self.__read()
+            section = sections.pop(self.__fingerprint, dict())
+            section.update(self.__changed)
+            sections[self.__fingerprint] = section
+            while len(sections) > self.__max_sections:
+                del sections[next(iter(sections))]
+            self.__write(sections)
+        self.__changed.clear()
+
+    def __key(self, key: tuple[str, str]) -> str:
+        return self.__KEY_SEPARATOR.join(map(str, key))
+
+    def __read(self) -> dict[str, dict[str, list[str] | None]]:
+        try:
+            with open(self.__path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return dict()
+
+    def __write(self, sections: dict[str, dict[str, list[str] | None]]) -> None:
+        descriptor, temp_path = tempfile.mkstemp(dir=self.__path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                json.dump(sections, file, ensure_ascii=False)
+            os.replace(temp_path, self.__path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+@contextmanager
+def _locked(path: Path) -> Iterator[None]:
+    with open(path, 'a+b') as lock:
+        if msvcrt is None:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        else:
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if msvcrt is None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,203 @@
+import dataclasses
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+from profiling import *
+
+
+@dataclass(frozen=True)
+class StageMetrics:
+    stage: str
+    wall_time: float
+    cpu_time: float
+    memory_peak: int | None = None
+
+
+@dataclass
+class FileMetrics:
+    file: str
+    ugms_code: str | None
+    stages: list[StageMetrics] = field(default_factory=list)
+    output_dir: str = ''
+
+    @property
+    def wall_time(self) -> float:
+        return sum(stage.wall_time for stage in self.stages)
+
+    @property
+    def cpu_time(self) -> float:
+        return sum(stage.cpu_time for stage in self.stages)
+
+
+@dataclass(frozen=True)
+class FileFailure:
+    file: str
+    stage: str
+    error: str
+    message: str
+    attempts: int = 1
+
+    @classmethod
+    def of(cls, file: str, error: Exception, stage: str = 'read') -> 'FileFailure':
+        return cls(file=file,
+                   stage=getattr(error, 'failed_stage', stage),
+                   error=type(error).__name__,
+                   message=str(error),
+                   attempts=getattr(error, 'attempts', 1))
+
+    @staticmethod
+    def mark_stage(error: Exception, stage: str) -> None:
+        if not hasattr(error, 'failed_stage'):
+            error.failed_stage = stage
+
+
+class StageRecorder:
+
+    def __init__(self, trace_memory: bool = False, profiler: FileProfiler = None):
+        self.__trace_memory = trace_memory
+        self.__profiler = profiler
+        self.__stages = list()
+
+    @property
+    def stages(self) -> list[StageMetrics]:
+        return self.__stages
+
+    # CPU time is per thread, so stages running on the writer thread are not charged for parsing.
+    # Memory peaks are process wide and only approximate when files are converted concurrently.
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        tracing = self.__trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            with nullcontext() if self.__profiler is None else self.__profiler.stage(name):
+                yield
+        except Exception as error:
+            FileFailure.mark_stage(error, name)
+            raise
+        finally:
+            memory_peak = None
+            if tracing and tracemalloc.is_tracing():
+                memory_peak = max(0, tracemalloc.get_traced_memory()[1] - start_memory)
+            self.__stages.append(StageMetrics(stage=name,
+                                              wall_time=time.perf_counter() - start_wall,
+                                              cpu_time=time.thread_time() - start_cpu,
+                                              memory_peak=memory_peak))
+
+
+class MemoryTracing:
+
+    __lock = threading.Lock()
+    __users = 0
+    __started = False
+
+    @classmethod
+    @contextmanager
+    def enabled(cls, enabled: bool = True) -> Iterator[None]:
+        if not enabled:
+            yield
+            return
+        cls.__acquire()
+        try:
+            yield
+        finally:
+            cls.__release()
+
+    @classmethod
+    def __acquire(cls) -> None:
+        with cls.__lock:
+            if cls.__users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                cls.__started = True
+            cls.__users += 1
+
+    @classmethod
+    def __release(cls) -> None:
+        with cls.__lock:
+            cls.__users -= 1
+            if cls.__users == 0 and cls.__started:
+                tracemalloc.stop()
+                cls.__started = False
+
+
+@dataclass
+class RunMetrics:
+    files: list[FileMetrics] = field(default_factory=list)
+    failures: list[FileFailure] = field(default_factory=list)
+
+    @classmethod
+    def merge(cls, runs: list['RunMetrics']) -> 'RunMetrics':
+        return cls([file for run in runs for file in run.files], [failure for run in runs for failure in run.failures])
+
+    def totals(self) -> dict[str, StageMetrics]:
+        totals = dict()
+        for file in self.files:
+            for stage in file.stages:
+                total = totals.get(stage.stage)
+                if total is None:
+                    totals[stage.stage] = stage
+                    continue
+                peaks = [peak for peak in (total.memory_peak, stage.memory_peak) if peak is not None]
+                totals[stage.stage] = StageMetrics(stage=stage.stage,
+                                                   wall_time=total.wall_time + stage.wall_time,
+                                                   cpu_time=total.cpu_time + stage.cpu_time,
+                                                   memory_peak=max(peaks) if peaks else None)
+        return totals
+
+    def export(self, path: Path | str) -> None:
+        path = Path(path)
+        if path.suffix == '.prom':
+            self.write_prometheus(path)
+        else:
+            self.write_json_lines(path)
+
+    def write_json_lines(self, path: Path | str) -> None:
+        timestamp = datetime.now().isoformat(timespec='seconds')
+        with open(path, 'a', encoding='utf-8') as file:
+            for metrics in self.files:
+                record = {'timestamp': timestamp, **dataclasses.asdict(metrics)}
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def write_prometheus(self, path: Path | str) -> None:
+        gauges = [
+            ('planet_converter_stage_wall_seconds', 'Wall time of a conversion stage', 'wall_time'),
+            ('planet_converter_stage_cpu_seconds', 'CPU time of a conversion stage', 'cpu_time'),
+            ('planet_converter_stage_memory_peak_bytes', 'Traced memory peak of a conversion stage', 'memory_peak'),
+        ]
+        lines = list()
+        for name, description, attribute in gauges:
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} gauge')
+            for labels, value in self.__series(attribute).items():
+                lines.append(f'{name}{{{labels}}} {value}')
+        Path(path).write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+    # Merged runs may hold the same file more than once, a label set must still appear only once per gauge
+    def __series(self, attribute: str) -> dict[str, float]:
+        series = dict()
+        for metrics in self.files:
+            for stage in metrics.stages:
+                value = getattr(stage, attribute)
+                if value is None:
+                    continue
+                labels = self.__labels(output_dir=metrics.output_dir, file=metrics.file,
+                                       ugms_code=metrics.ugms_code or '', stage=stage.stage)
+                if labels in series:
+                    value = max(series[labels], value) if attribute == 'memory_peak' else series[labels] + value
+                series[labels] = value
+        return series
+
+    @staticmethod
+    def __labels(**labels: str) -> str:
+        escaped = {key: value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                   for key, value in labels.items()}
+        return ','.join(f'{key}="{value}"' for key, value in escaped.items())
@@ -1,6 +1,5 @@
 from abc import ABC, abstractmethod
 from typing import Any
-import re
 import numpy as np
 from pandas import DataFrame
 from entities import *
@@ -36,9 +35,25 @@ class UGMSParserBase(ParserBase, ABC):
 
     UGMS_CODE = None
 
+    @classmethod
+    def matches(cls, file_content) -> bool:
+        return True
+
+    @classmethod
+    def parse_batch(cls, file_content) -> ObservationBatch:
+        return ObservationBatch.from_points(cls.parse(file_content))
+
+    @classmethod
+    async def parse_batch_async(cls, file_content) -> ObservationBatch:
+        return cls.parse_batch(file_content)
+
 
 class DocParser(UGMSParserBase, ABC):
 
+    _HEADER_ROWS = 3
+    _MIN_COLUMNS = 7
+    _FLOOD_LEVEL_HEADER = 'Опасн'
+
     @classmethod
     def parse(cls, tables) -> list[ObservationPointDTOBase]:
         table = cls._read_tables(tables)
@@ -46,6 +61,32 @@ class DocParser(UGMSParserBase, ABC):
         cls._cut_top(table)
         return cls._parse_table(table)
 
+    @classmethod
+    def matches(cls, tables) -> bool:
+        return isinstance(tables, list) and any(cls._is_header_row(row) for row in cls._header_rows(tables))
+
+    @classmethod
+    def _header_rows(cls, tables) -> list[list[str]]:
+        rows = list()
+        for table in tables:
+            if not hasattr(table, 'rows'):
+                return list()
+            for row in table.rows[:cls._HEADER_ROWS]:
+                rows.append([cell.text.replace(' ', '').replace('\n', '') for cell in row.cells])
+        return rows
+
+    @classmethod
+    def _is_header_row(cls, cells: list[str]) -> bool:
+        return len(cells) > 0 and cls._is_header_cell(cells[0])
+
+    @staticmethod
+    def _is_header_cell(cell: str) -> bool:
+        return cell.startswith('Река') and any(dash in cell for dash in '—–-')
+
+    @classmethod
+    def _has_flood_level(cls, cells: list[str]) -> bool:
+        return any(cell.startswith(cls._FLOOD_LEVEL_HEADER) for cell in cells)
+
     @staticmethod
     def _read_tables(tables) -> list[list[str]]:
         data = list()
@@ -128,10 +169,19 @@ class ParserOI(UGMSParserBase):
     __FLOODPLAIN_LEVEL_COLUMN = 5
     __ICE_COLUMN = 6
 
+    __HEADER_ROWS = 30
+
     @classmethod
     def parse(cls, tables):
         return cls.__parse_table(cls.__read_tables(tables))
 
+    @classmethod
+    def matches(cls, file_content) -> bool:
+        if not (hasattr(file_content, 'nrows') and hasattr(file_content, 'cell_value')):
+            return False
+        return any(file_content.cell_value(row, 0) == 'Река'
+                   for row in range(min(file_content.nrows, cls.__HEADER_ROWS)))
+
     @classmethod
     def __read_tables(cls, file_content):
         table = list()
@@ -201,6 +251,15 @@ class ParserI(DocParser):
             return cls.__parse_table_with_ice(table)
         return cls._parse_table(table)
 
+    # The river table of ParserB and ParserZB bulletins has at least 7 columns, a narrower one is this parser's
+    @classmethod
+    def _is_header_row(cls, cells: list[str]) -> bool:
+        if len(cells) == 0:
+            return False
+        if cls.__check_if_water_object_line(cells[0]):
+            return True
+        return cls.__check_if_river_line(cells[0]) and len(cells) < cls._MIN_COLUMNS
+
     @classmethod
     def _read_tables(cls, tables) -> tuple[list[list[str]], bool]:
         table_objects, table_water_objects = cls.__get_tables(tables)
@@ -272,11 +331,12 @@ class ParserI(DocParser):
                     data.append(row_data)
         return data, has_state
 
+    # Drops the 'Водный объект – пункт' header row, which _split_name has already cut at the dash
     @staticmethod
     def __do_some_voodoo_stuff(table: list[list[str]]) -> list[list[str]]:
         new_table = list()
         for row in table:
-            if re.sub(r'[^a-zA-Z\s]', '', row[0]) != re.sub(r'[^a-zA-Z\s]', '', "Водный объект – пункт"):
+            if row[0].replace(' ', '') != 'Водныйобъект':
                 new_table.append(row)
         return new_table
 
@@ -358,6 +418,11 @@ class ParserZB(DocParser):
     __ICE_COLUMN = 4
     __FLOODPLAIN_LEVEL_COLUMN = 5
 
+    # Same header as ParserB, but without the flood level column
+    @classmethod
+    def _is_header_row(cls, cells: list[str]) -> bool:
+        return super()._is_header_row(cells) and not cls._has_flood_level(cells)
+
     @classmethod
     def _parse_table(cls, table: list[list[str]]) -> list[ZBObservationPointDTO]:
         dto_table = list()
@@ -393,6 +458,10 @@ class ParserB(DocParser):
     __FLOODPLAIN_LEVEL_COLUMN = 5
     __FLOOD_LEVEL_COLUMN = 6
 
+    @classmethod
+    def _is_header_row(cls, cells: list[str]) -> bool:
+        return super()._is_header_row(cells) and len(cells) >= cls._MIN_COLUMNS and cls._has_flood_level(cells)
+
     @classmethod
     def _parse_table(cls, table: list[list[str]]) -> list[BObservationPointDTO]:
         dto_table = list()
@@ -437,113 +506,230 @@ class ParserZS(UGMSParserBase):
     __WATER_LEVEL_CHANGE_COLUMN = 3
     __ICE_COLUMN = 4
     __FLOOD_LEVEL_COLUMN = 5
+    __LINE_PARTS = 11
+    __LINE_PARTS_USED = (1, 2, 3, 4, 8, 9)
+    __FIXED_LAYOUT_MIN_LINES = 64
+    __FIXED_LAYOUT_BLOCK = 4096
+
+    __ENCODINGS = ('cp866', 'cp1251')
+    __SNIFF_SAMPLE = 64 * 1024
+    __CYRILLIC = frozenset('абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ')
 
     @classmethod
     def parse(cls, file_content: list[str]) -> list[ZSObservationPointDTO]:
-        cls.__take_useful_content(file_content)
-        parsed_lines = cls.__parse_lines(file_content)
-        table = cls.__create_table(parsed_lines)
-        return table
+        return cls.parse_batch(file_content).to_points()
+
+    # Only the table is decoded, a buffer without its start or end line is not a bulletin and is not decoded at all
+    @classmethod
+    def extract_table(cls, buffer: bytes) -> list[str]:
+        start = cls.__find_line(buffer, cls.__START_LINE_TEXT, 0)
+        if start is None:
+            raise StartLineNotPresentException()
+        end = cls.__find_line(buffer, cls.__END_LINE_TEXT, start)
+        if end is None:
+            raise EndLineNotPresentException()
+        end_of_line = buffer.find(b'\n', end)
+        return cls.__decode(buffer[start:len(buffer) if end_of_line == -1 else end_of_line + 1])
+
+    @staticmethod
+    def __find_line(buffer: bytes, line: str, start: int) -> int | None:
+        marker = line.rstrip('\n').encode('ascii')
+        position = buffer.find(marker, start)
+        while position != -1:
+            line_end = position + len(marker)
+            starts_line = position == 0 or buffer[position - 1:position] == b'\n'
+            ends_line = line_end == len(buffer) or buffer[line_end:line_end + 1] in (b'\n', b'\r')
+            if starts_line and ends_line:
+                return position
+            position = buffer.find(marker, position + 1)
+        return None
+
+    @classmethod
+    def __decode(cls, region: bytes) -> list[str]:
+        try:
+            text = region.decode('utf-8')
+        except UnicodeDecodeError:
+            text = region.decode(cls.__sniff_encoding(region[:cls.__SNIFF_SAMPLE]))
+        return text.replace('\r\n', '\n').splitlines(keepends=True)
+
+    @classmethod
+    def __sniff_encoding(cls, sample: bytes) -> str:
+        return max(cls.__ENCODINGS, key=lambda encoding: cls.__count_cyrillic(sample, encoding))
+
+    # Every byte that is not a Cyrillic letter in the encoding is deleted, the rest are counted
+    @classmethod
+    def __count_cyrillic(cls, sample: bytes, encoding: str) -> int:
+        others = bytes(byte for byte in range(256) if bytes((byte,)).decode(encoding, 'replace') not in cls.__CYRILLIC)
+        return len(sample.translate(None, others))
+
+    @classmethod
+    def parse_batch(cls, file_content: list[str]) -> ObservationBatch:
+        useful_content = cls.__take_useful_content(file_content)
+        columns = cls.__cut_fixed_columns(useful_content)
+        if columns is None:
+            columns = cls.__merge_continuation_lines(cls.__split_columns(useful_content))
+        return cls.__create_batch(columns)
+
+    @classmethod
+    def matches(cls, file_content) -> bool:
+        return isinstance(file_content, list) and cls.__START_LINE_TEXT in file_content
 
     @classmethod
     def __take_useful_content(cls, file_content: list[str]) -> list[str]:
-        cls.__cut_top(file_content)
-        cls.__cut_bottom(file_content)
-        return file_content
+        lines = cls.__cut_top(file_content)
+        return cls.__cut_bottom(lines)
 
     @classmethod
-    def __cut_top(cls, lines: list[str]) -> None:
+    def __cut_top(cls, lines: list[str]) -> list[str]:
         try:
-            delete_before = lines.index(cls.__START_LINE_TEXT) + 1
-            del lines[:delete_before]
+            return lines[lines.index(cls.__START_LINE_TEXT) + 1:]
         except ValueError as e:
             raise StartLineNotPresentException() from e
 
     @classmethod
-    def __cut_bottom(cls, lines: list[str]) -> None:
+    def __cut_bottom(cls, lines: list[str]) -> list[str]:
         try:
-            delete_after = lines.index(cls.__END_LINE_TEXT)
-            del lines[delete_after:]
+            return lines[:lines.index(cls.__END_LINE_TEXT)]
         except ValueError as e:
             raise EndLineNotPresentException() from e
 
+    # The table is printed with fixed width columns. When every line has its separators at the same places, the lines
+    # are viewed block by block as a character matrix and each used column is read from it as a numpy string array, so no
+    # Python string is created per cell. The water name comes first and tells which lines of the block are stations.
+    # Short tables are cheaper to split line by line.
     @classmethod
-    def __parse_lines(cls, lines: list[str]) -> list[list[str]]:
-        table = []
-        for row in lines:
-            columns = cls.__split_by_semicolon(row)
-            cls.__remove_unused_columns(columns)
-            cls.__parse_columns(columns)
-            table.append(columns)
-        cls.__process_ice_column(table)
-        return table
-
+    def __cut_fixed_columns(cls, lines: list[str]) -> list[np.ndarray] | None:
+        if len(lines) < cls.__FIXED_LAYOUT_MIN_LINES:
+            return None
+        width = len(lines[0])
+        separators = np.flatnonzero(np.frombuffer(lines[0].encode('utf-32-le'), dtype=np.uint32) == ord(':'))
+        if len(separators) != cls.__LINE_PARTS - 1 or np.diff(separators).min() < 2:
+            return None
+        parts = [(separators[part - 1] + 1, separators[part]) for part in cls.__LINE_PARTS_USED]
+        columns = [np.empty(len(lines), dtype=f'<U{end - start}') for start, end in parts]
+        continuation = np.zeros(len(lines), dtype=bool)
+        continued_ice = list()
+        stations = 0
+        for first in range(0, len(lines), cls.__FIXED_LAYOUT_BLOCK):
+            table = cls.__fixed_table(lines[first:first + cls.__FIXED_LAYOUT_BLOCK], width, separators)
+            if table is None:
+                return None
+            block_continuation = continuation[first:first + len(table)]
+            station_lines = None
+            for index, (start, end) in enumerate(parts):
+                cells = table[:, start:end]
+                if index == cls.__WATER_NAME_COLUMN:
+                    cells = cls.__blank_river_prefix(cells)
+                block = cells.view(f'<U{end - start}')[:, 0]
+                block = np.strings.strip(block) if index == cls.__ICE_COLUMN else np.strings.strip(block, ' ')
+                if index == cls.__WATER_NAME_COLUMN:
+                    block_continuation[:] = block == ''
+                    if block_continuation.any():
+                        station_lines = ~block_continuation
+                if station_lines is not None:
+                    if index == cls.__ICE_COLUMN:
+                        continued_ice.append(block[block_continuation])
+                    block = block[station_lines]
+                columns[index][stations:stations + len(block)] = block
+            stations += len(block)
+        columns = [column[:stations] for column in columns]
+        # After the strip only the spaces inside the cells are left
+        for index, column in enumerate(columns):
+            if index != cls.__ICE_COLUMN and (column.view(np.uint32) == ord(' ')).any():
+                columns[index] = np.strings.replace(column, ' ', '')
+        continued = cls.__find_continuation_lines(continuation)
+        if continued is not None:
+            owned, owners, ranks = continued
+            continued_ice = np.concatenate(continued_ice)[owned]
+            columns[cls.__ICE_COLUMN] = cls.__append_continuation_lines(columns[cls.__ICE_COLUMN], continued_ice,
+                                                                         owners, ranks)
+        return columns
+
+    # Every line ends with its only line break, so with one at the end of every row of the matrix the rows are the lines
     @staticmethod
-    def __split_by_semicolon(line: str) -> list[str]:
-        splitted = line.split(':')
-        if len(splitted) != 11:
-            raise MissingColumnException()
-        return splitted[1:10]
+    def __fixed_table(lines: list[str], width: int, separators: np.ndarray) -> np.ndarray | None:
+        text = ''.join(lines)
+        if len(text) != width * len(lines):
+            return None
+        table = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).reshape(len(lines), width)
+        if np.count_nonzero(table == ord(':')) != len(separators) * len(lines) or \
+                not (table[:, -1] == ord('\n')).all() or not (table[:, separators] == ord(':')).all():
+            return None
+        return table
 
+    # Same as str.replace('р.', ''), the prefix becomes spaces, which are removed with the rest. The cells are searched
+    # as one run of characters, so a match across the end of a cell is left out.
     @staticmethod
-    def __remove_unused_columns(columns: list[str]) -> None:
-        columns.pop(4)
-        columns.pop(4)
-        columns.pop(4)
-
-    @classmethod
-    def __parse_columns(cls, columns: list[str]) -> None:
-        cls.__remove_river_abbreviation(columns)
-        cls.__remove_white_spaces(columns)
-
-    @classmethod
-    def __remove_river_abbreviation(cls, columns: list[str]) -> None:
-        columns[cls.__WATER_NAME_COLUMN] = columns[cls.__WATER_NAME_COLUMN].replace('р.', '')
+    def __blank_river_prefix(cells: np.ndarray) -> np.ndarray:
+        cells = cells.copy()
+        characters = cells.reshape(-1)
+        starts = np.flatnonzero((characters[:-1] == ord('р')) & (characters[1:] == ord('.')))
+        starts = starts[starts % cells.shape[1] != cells.shape[1] - 1]
+        characters[starts] = ord(' ')
+        characters[starts + 1] = ord(' ')
+        return cells
 
     @classmethod
-    def __remove_white_spaces(cls, columns: list[str]) -> None:
-        for index, column in enumerate(columns):
-            if index == cls.__ICE_COLUMN: continue
-            columns[index] = column.replace(' ', '')
-
-    @classmethod
-    def __process_ice_column(cls, lines: list[list[str]]) -> None:
-        empty_lines = 0
-        for index, line in enumerate(lines):
-            line[cls.__ICE_COLUMN] = line[cls.__ICE_COLUMN].strip()
-            lines[index] = line
-            if cls.__is_line_empty(line):
-                empty_lines += 1
-                lines[index - empty_lines][cls.__ICE_COLUMN] += ' ' + line[cls.__ICE_COLUMN]
+    def __split_columns(cls, lines: list[str]) -> list[np.ndarray]:
+        rows = [line.split(':') for line in lines]
+        if any(len(row) != cls.__LINE_PARTS for row in rows):
+            raise MissingColumnException()
+        parts = list(zip(*rows)) if rows else [()] * cls.__LINE_PARTS
+        columns = list()
+        for index, part in enumerate(cls.__LINE_PARTS_USED):
+            if index == cls.__WATER_NAME_COLUMN:
+                column = [cell.replace('р.', '').replace(' ', '') for cell in parts[part]]
+            elif index == cls.__ICE_COLUMN:
+                column = list(map(str.strip, parts[part]))
             else:
-                empty_lines = 0
-        cls.__remove_empty_rows(lines)
+                column = [cell.replace(' ', '') for cell in parts[part]]
+            columns.append(np.array(column, dtype=str))
+        return columns
 
     @classmethod
-    def __remove_empty_rows(cls, lines: list[list[str]]) -> None:
-        for index, line in enumerate(lines):
-            if not cls.__is_line_empty(line): continue
-            del lines[index]
-
+    def __merge_continuation_lines(cls, columns: list[np.ndarray]) -> list[np.ndarray]:
+        continuation = columns[cls.__WATER_NAME_COLUMN] == ''
+        continued = cls.__find_continuation_lines(continuation)
+        if continued is None:
+            return columns
+        owned, owners, ranks = continued
+        continued_ice = columns[cls.__ICE_COLUMN][continuation][owned]
+        merged = [column[~continuation] for column in columns]
+        merged[cls.__ICE_COLUMN] = cls.__append_continuation_lines(merged[cls.__ICE_COLUMN], continued_ice, owners, ranks)
+        return merged
+
+    # A line without a water name carries the rest of the ice description of the station above it. Continuation lines
+    # before the first station have no station and are dropped. Returns which continuation lines are kept, the station
+    # each of them belongs to, counted among the stations only, and its place among the continuation lines of it.
     @staticmethod
-    def __is_line_empty(line: list[str]) -> bool:
-        emptiness_check_index = 0
-        if line[emptiness_check_index] == '':
-            return True
-        else:
-            return False
+    def __find_continuation_lines(continuation: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+        if not continuation.any():
+            return None
+        lines = np.flatnonzero(continuation)
+        owners = np.maximum.accumulate(np.where(continuation, -1, np.arange(len(continuation))))[lines]
+        owned = owners >= 0
+        stations = np.cumsum(~continuation)[lines] - 1
+        return owned, stations[owned], (lines - owners)[owned]
+
+    # Consecutive continuation lines are appended in their order, one rank of them at a time
+    @staticmethod
+    def __append_continuation_lines(ice: np.ndarray, continued_ice: np.ndarray,
+                                    owners: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+        for rank in np.unique(ranks):
+            selected = ranks == rank
+            merged = np.strings.add(np.strings.add(ice[owners[selected]], ' '), continued_ice[selected])
+            ice = ice.astype(np.result_type(ice, merged), copy=False)
+            ice[owners[selected]] = merged
+        return ice
 
     @classmethod
-    def __create_table(cls, parsed_lines: list[list[str]]) -> list[ZSObservationPointDTO]:
-        table = []
-        for line in parsed_lines:
-            observation_point = ZSObservationPointDTO(
-                water_name=line[cls.__WATER_NAME_COLUMN],
-                name=line[cls.__NAME_COLUMN],
-                water_level=line[cls.__WATER_LEVEL_COLUMN],
-                water_level_change=line[cls.__WATER_LEVEL_CHANGE_COLUMN],
-                ice=line[cls.__ICE_COLUMN],
-                flood_level=line[cls.__FLOOD_LEVEL_COLUMN],
-                ice_thickness='')
-            table.append(observation_point)
-        return table
+    def __create_batch(cls, columns: list[np.ndarray]) -> ObservationBatch:
+        return ObservationBatch(ZSObservationPointDTO, {
+            'water_name': columns[cls.__WATER_NAME_COLUMN],
+            'name': columns[cls.__NAME_COLUMN],
+            'water_level': columns[cls.__WATER_LEVEL_COLUMN],
+            'water_level_change': columns[cls.__WATER_LEVEL_CHANGE_COLUMN],
+            'ice': columns[cls.__ICE_COLUMN],
+            'flood_level': columns[cls.__FLOOD_LEVEL_COLUMN],
+            'ice_thickness': np.full(len(columns[cls.__WATER_NAME_COLUMN]), '')
+        })
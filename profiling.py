@@ -0,0 +1,139 @@
+import cProfile
+import fnmatch
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+
+@dataclass(frozen=True)
+class ProfilingOptions:
+    directory: Path
+    files: tuple[str, ...] = ()
+    stages: tuple[str, ...] = ()
+    cprofile: bool = True
+    sample_interval: float | None = None
+
+    def selects_file(self, file: Path) -> bool:
+        return not self.files or any(fnmatch.fnmatch(file.name, pattern) for pattern in self.files)
+
+    def selects_stage(self, stage: str) -> bool:
+        return not self.stages or stage in self.stages
+
+
+class StackSampler:
+
+    def __init__(self, interval: float):
+        self.__interval = interval
+        self.__threads: set[int] = set()
+        self.__samples = Counter()
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+    @property
+    def samples(self) -> Counter:
+        return self.__samples
+
+    def add_thread(self, ident: int) -> None:
+        self.__threads.add(ident)
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__run, name='stack-sampler', daemon=True)
+            self.__thread.start()
+
+    def remove_thread(self, ident: int) -> None:
+        self.__threads.discard(ident)
+
+    def stop(self) -> None:
+        self.__stopped.set()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def __run(self) -> None:
+        while not self.__stopped.wait(self.__interval):
+            frames = sys._current_frames()
+            for ident in list(self.__threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.__samples[self.__collapse(frame)] += 1
+
+    @staticmethod
+    def __collapse(frame) -> str:
+        names = list()
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+
+class FileProfiler:
+
+    def __init__(self, options: ProfilingOptions, file: Path):
+        self.__options = options
+        self.__file = file
+        self.__profile = cProfile.Profile() if options.cprofile else None
+        self.__profiled = False
+        self.__sampler = None if options.sample_interval is None else StackSampler(options.sample_interval)
+
+    @classmethod
+    def create(cls, options: ProfilingOptions | None, file: Path) -> 'FileProfiler | None':
+        if options is None or not options.selects_file(file):
+            return None
+        return cls(options, file)
+
+    @property
+    def stats_path(self) -> Path:
+        return self.__options.directory.joinpath(f'{self.__file.name}.pstats')
+
+    @property
+    def collapsed_path(self) -> Path:
+        return self.__options.directory.joinpath(f'{self.__file.name}.collapsed')
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.__options.selects_stage(name):
+            yield
+            return
+        ident = threading.get_ident()
+        if self.__sampler is not None:
+            self.__sampler.add_thread(ident)
+        enabled = self.__enable()
+        try:
+            yield
+        finally:
+            if enabled:
+                self.__profile.disable()
+            if self.__sampler is not None:
+                self.__sampler.remove_thread(ident)
+
+    # The process side of a file dumps first, the write stage then merges into the same files
+    def dump(self, merge: bool = False) -> None:
+        self.__options.directory.mkdir(parents=True, exist_ok=True)
+        if not merge:
+            self.stats_path.unlink(missing_ok=True)
+            self.collapsed_path.unlink(missing_ok=True)
+        if self.__profiled:
+            stats = pstats.Stats(self.__profile)
+            if self.stats_path.exists():
+                stats.add(str(self.stats_path))
+            stats.dump_stats(self.stats_path)
+        if self.__sampler is not None:
+            self.__sampler.stop()
+            with open(self.collapsed_path, 'a', encoding='utf-8') as file:
+                for stack, count in self.__sampler.samples.items():
+                    file.write(f'{stack} {count}\n')
+
+    def __enable(self) -> bool:
+        if self.__profile is None:
+            return False
+        try:
+            self.__profile.enable()
+        except ValueError:
+            # Another profiler is already active, e.g. a stage profiled on the writer thread on 3.12+
+            return False
+        self.__profiled = True
+        return True
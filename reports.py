@@ -0,0 +1,77 @@
+import csv
+import dataclasses
+import json
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from metrics import *
+
+
+class ReportFormat(Enum):
+    CSV = 'csv'
+    JSON = 'json'
+
+
+class UnmatchedReport:
+
+    DIRECTORY = 'unmatched'
+
+    def __init__(self, output_dir: Path, report_format: ReportFormat = ReportFormat.CSV):
+        self.__directory = output_dir.joinpath(self.DIRECTORY)
+        self.__format = report_format
+
+    def path(self, name: str) -> Path:
+        return self.__directory.joinpath(f'{name}.{self.__format.value}')
+
+    def write(self, name: str, file: Path, ugms_code: str, unmatched: list[tuple[str, str]]) -> Path | None:
+        path = self.path(name)
+        stations = list(dict.fromkeys(unmatched))
+        if not stations:
+            path.unlink(missing_ok=True)
+            return None
+        self.__directory.mkdir(exist_ok=True)
+        if self.__format is ReportFormat.JSON:
+            self.__write_json(path, file, ugms_code, stations)
+        else:
+            self.__write_csv(path, file, ugms_code, stations)
+        return path
+
+    # Same ';' separated utf-8 layout as the renames CSV, so rows can be copied into it
+    @staticmethod
+    def __write_csv(path: Path, file: Path, ugms_code: str, stations: list[tuple[str, str]]) -> None:
+        with open(path, 'w', encoding='utf-8', newline='') as report:
+            writer = csv.writer(report, delimiter=';')
+            writer.writerow(['name', 'water_name', 'file', 'ugms_code'])
+            writer.writerows((name, water_name, file.name, ugms_code) for name, water_name in stations)
+
+    @staticmethod
+    def __write_json(path: Path, file: Path, ugms_code: str, stations: list[tuple[str, str]]) -> None:
+        report = {
+            'file': file.name,
+            'ugms_code': ugms_code,
+            'unmatched': [{'name': name, 'water_name': water_name} for name, water_name in stations]
+        }
+        with open(path, 'w', encoding='utf-8') as file_report:
+            json.dump(report, file_report, ensure_ascii=False, indent=1)
+
+
+class RunReport:
+
+    FILE_NAME = 'run_report.json'
+
+    def __init__(self, output_dir: Path):
+        self.__path = output_dir.joinpath(self.FILE_NAME)
+
+    @property
+    def path(self) -> Path:
+        return self.__path
+
+    def write(self, metrics: RunMetrics) -> Path:
+        report = {
+            'finished': datetime.now().isoformat(timespec='seconds'),
+            'converted': [{'file': file.file, 'ugms_code': file.ugms_code} for file in metrics.files],
+            'failed': [dataclasses.asdict(failure) for failure in metrics.failures]
+        }
+        with open(self.__path, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=1)
+        return self.__path
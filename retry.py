@@ -0,0 +1,58 @@
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+from exceptions import *
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int = 3
+    delay: float = 0.5
+    backoff: float = 2.0
+    transient: tuple[type[Exception], ...] = (OSError, DocConversionException)
+    permanent: tuple[type[Exception], ...] = (FileNotFoundError, IsADirectoryError, NotADirectoryError)
+
+    # Bulletins locked by Word or an antivirus and a busy conversion backend usually recover within seconds,
+    # a missing file does not
+    def is_transient(self, error: Exception) -> bool:
+        return isinstance(error, self.transient) and not isinstance(error, self.permanent)
+
+    def delays(self) -> Iterator[float]:
+        delay = self.delay
+        for _ in range(self.attempts - 1):
+            yield delay
+            delay *= self.backoff
+
+    def call(self, function: Callable[..., Any], *args) -> Any:
+        delays = self.delays()
+        attempt = 1
+        while True:
+            try:
+                return function(*args)
+            except Exception as error:
+                delay = self.__next_delay(error, delays, attempt)
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, function: Callable[..., Any], *args) -> Any:
+        delays = self.delays()
+        attempt = 1
+        while True:
+            try:
+                result = function(*args)
+                if inspect.isawaitable(result):
+                    result = await result
+                return result
+            except Exception as error:
+                delay = self.__next_delay(error, delays, attempt)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def __next_delay(self, error: Exception, delays: Iterator[float], attempt: int) -> float:
+        delay = next(delays, None) if self.is_transient(error) else None
+        if delay is None:
+            error.attempts = attempt
+            raise error
+        return delay
@@ -0,0 +1,156 @@
+import csv
+import itertools
+import json
+import operator
+import typing
+from contextlib import contextmanager
+from enum import Enum
+from json.encoder import encode_basestring
+from pathlib import Path
+from typing import IO, Iterable, Iterator
+from entities import *
+
+
+class ObservationFormat(Enum):
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+
+    @classmethod
+    def of(cls, path: Path | str) -> 'ObservationFormat':
+        return cls(Path(path).suffix.lstrip('.').lower())
+
+
+class ObservationWriter:
+
+    CSV_DELIMITER = ';'
+
+    def __init__(self, point_type: type[ObservationPointDTOBase], observation_format: ObservationFormat,
+                 chunk_size: int = 4096):
+        self.__fields = list(point_type.dataframe_fields().values())
+        self.__format = observation_format
+        self.__chunk_size = chunk_size
+        self.__keys = [f'{encode_basestring(field)}:' for field in self.__fields]
+
+    @classmethod
+    def write(cls, observations: ObservationBatch | Iterable[ObservationPointDTOBase], target: Path | str | IO[str],
+              observation_format: ObservationFormat = None,
+              point_type: type[ObservationPointDTOBase] = None) -> int:
+        if observation_format is None:
+            observation_format = ObservationFormat.of(target)
+        if isinstance(observations, ObservationBatch):
+            point_type = point_type or observations.point_type
+        elif point_type is None:
+            observations = list(observations)
+            point_type = type(observations[0]) if observations else ObservationPointDTOBase
+        writer = cls(point_type, observation_format)
+        with _open(target, 'w') as file:
+            return writer.write_rows(writer.rows(observations), file)
+
+    # Rows are read straight from the batch columns or the fields of each point, without dataclasses.asdict
+    def rows(self, observations: ObservationBatch | Iterable[ObservationPointDTOBase]) -> Iterator[tuple]:
+        if isinstance(observations, ObservationBatch):
+            return zip(*(observations.column(field) for field in self.__fields))
+        getter = operator.attrgetter(*self.__fields)
+        if len(self.__fields) == 1:
+            return ((getter(point),) for point in observations)
+        return map(getter, observations)
+
+    def write_rows(self, rows: Iterable[tuple], file: IO[str]) -> int:
+        if self.__format is ObservationFormat.CSV:
+            return self.__write_csv(rows, file)
+        return self.__write_ndjson(rows, file)
+
+    def __write_ndjson(self, rows: Iterable[tuple], file: IO[str]) -> int:
+        count = 0
+        for chunk in self.__chunks(rows):
+            file.write(''.join(self.__json_line(row) for row in chunk))
+            count += len(chunk)
+        return count
+
+    def __write_csv(self, rows: Iterable[tuple], file: IO[str]) -> int:
+        writer = csv.writer(file, delimiter=self.CSV_DELIMITER, lineterminator='\n')
+        writer.writerow(self.__fields)
+        count = 0
+        for chunk in self.__chunks(rows):
+            writer.writerows(chunk)
+            count += len(chunk)
+        return count
+
+    def __chunks(self, rows: Iterable[tuple]) -> Iterator[list[tuple]]:
+        rows = iter(rows)
+        while chunk := list(itertools.islice(rows, self.__chunk_size)):
+            yield chunk
+
+    def __json_line(self, row: tuple) -> str:
+        return '{' + ','.join(key + self.__json_value(value) for key, value in zip(self.__keys, row)) + '}\n'
+
+    @staticmethod
+    def __json_value(value) -> str:
+        if isinstance(value, str):
+            return encode_basestring(value)
+        return json.dumps(value, ensure_ascii=False)
+
+
+class ObservationReader:
+
+    @classmethod
+    def read(cls, source: Path | str | IO[str], point_type: type[ObservationPointDTOBase],
+             observation_format: ObservationFormat = None) -> ObservationBatch:
+        if observation_format is None:
+            observation_format = ObservationFormat.of(source)
+        fields = list(point_type.dataframe_fields().values())
+        with _open(source, 'r') as file:
+            if observation_format is ObservationFormat.CSV:
+                columns = cls.__read_csv(file, point_type, fields)
+            else:
+                columns = cls.__read_ndjson(file, fields)
+        return ObservationBatch(point_type, columns)
+
+    @classmethod
+    def read_points(cls, source: Path | str | IO[str], point_type: type[ObservationPointDTOBase],
+                    observation_format: ObservationFormat = None) -> list[ObservationPointDTOBase]:
+        return cls.read(source, point_type, observation_format).to_points()
+
+    @staticmethod
+    def __read_ndjson(file: IO[str], fields: list[str]) -> dict[str, list]:
+        columns = {field: list() for field in fields}
+        appenders = [(field, columns[field].append) for field in fields]
+        for line in file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            for field, append in appenders:
+                append(record.get(field))
+        return columns
+
+    # CSV cells are text, they are converted back with the field types of the point type and an empty cell becomes None
+    # where the field allows it. The bulletin points declare every field as str, so for them an empty cell stays '' and
+    # a number read from an xls bulletin comes back as its text. NDJSON keeps None and numbers as they were written.
+    @classmethod
+    def __read_csv(cls, file: IO[str], point_type: type[ObservationPointDTOBase],
+                   fields: list[str]) -> dict[str, list]:
+        reader = csv.reader(file, delimiter=ObservationWriter.CSV_DELIMITER)
+        header = next(reader, fields)
+        rows = list(reader)
+        columns = {field: list(column) for field, column in zip(header, zip(*rows))} if rows else dict()
+        types = typing.get_type_hints(point_type)
+        return {field: cls.__convert(columns[field], types.get(field, str)) if field in columns else [None] * len(rows)
+                for field in fields}
+
+    @staticmethod
+    def __convert(cells: list[str], field_type: type) -> list:
+        arguments = typing.get_args(field_type)
+        optional = type(None) in arguments
+        value_type = next((argument for argument in arguments if argument is not type(None)), field_type)
+        if value_type is str and not optional:
+            return cells
+        return [None if cell == '' and (optional or value_type is not str) else value_type(cell) for cell in cells]
+
+
+@contextmanager
+def _open(target: Path | str | IO[str], mode: str) -> Iterator[IO[str]]:
+    if not isinstance(target, (Path, str)):
+        yield target
+        return
+    with open(target, mode, encoding='utf-8', newline='') as file:
+        yield file
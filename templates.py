@@ -0,0 +1,125 @@
+import hashlib
+import threading
+from pathlib import Path
+import geopandas
+from geopandas import GeoDataFrame
+from entities import *
+from matching import *
+
+
+class TemplateRegistry:
+
+    __SIDECAR_SUFFIX = '.feather'
+    __SHAPEFILE_PARTS = ('.shp', '.shx', '.dbf', '.prj', '.cpg')
+    __ORIGINAL_COLUMNS = ['river', 'name', 'geometry']
+
+    __lock = threading.RLock()
+    __templates: dict[Path, tuple[tuple, GeoDataFrame]] = dict()
+    __indices: dict[Path, tuple[tuple, TemplateIndex]] = dict()
+    __fingerprints: dict[Path, tuple[tuple, str]] = dict()
+
+    use_sidecar = True
+
+    # The sidecar goes to a cache directory of the run, templates often sit in shared read-only folders
+    @classmethod
+    def load(cls, path: Path, cache_dir: Path = None) -> GeoDataFrame:
+        path = path.resolve()
+        version = cls.__version(path)
+        with cls.__lock:
+            cached = cls.__templates.get(path)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            template = cls.__read(path, version, cache_dir)
+            cls.__templates[path] = (version, template)
+            return template
+
+    @classmethod
+    def index(cls, path: Path, cache_dir: Path = None) -> TemplateIndex:
+        template = cls.load(path, cache_dir)
+        path = path.resolve()
+        version = cls.__templates[path][0]
+        with cls.__lock:
+            cached = cls.__indices.get(path)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            index = TemplateIndex(template[WaterNameProperty.dataframe_name()].tolist(),
+                                  template[NameProperty.dataframe_name()].tolist())
+            cls.__indices[path] = (version, index)
+            return index
+
+    # Hashes every file of the template, so editing a geometry or any attribute changes it
+    @classmethod
+    def fingerprint(cls, path: Path) -> str:
+        path = path.resolve()
+        version = cls.__version(path)
+        with cls.__lock:
+            cached = cls.__fingerprints.get(path)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            digest = hashlib.sha256()
+            for part in cls.__parts(path):
+                digest.update(part.suffix.encode('utf-8'))
+                digest.update(part.read_bytes())
+            cls.__fingerprints[path] = (version, digest.hexdigest())
+            return digest.hexdigest()
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls.__lock:
+            cls.__templates.clear()
+            cls.__indices.clear()
+            cls.__fingerprints.clear()
+
+    @classmethod
+    def __parts(cls, path: Path) -> list[Path]:
+        parts = dict.fromkeys([path] + [path.with_suffix(suffix) for suffix in cls.__SHAPEFILE_PARTS])
+        return [part for part in parts if part.exists()]
+
+    # Any change of size or modification time of a part counts, also a template replaced by an older copy
+    @classmethod
+    def __version(cls, path: Path) -> tuple:
+        return tuple((part.suffix, part.stat().st_size, part.stat().st_mtime_ns) for part in cls.__parts(path))
+
+    # The sidecar is named after the template's content, so it never serves another template that took its place
+    @classmethod
+    def sidecar_path(cls, path: Path, cache_dir: Path) -> Path:
+        path = path.resolve()
+        digest = hashlib.sha256(str(path).encode('utf-8')).hexdigest()[:16]
+        return cache_dir.joinpath(f'{path.stem}_{digest}_{cls.fingerprint(path)[:16]}{cls.__SIDECAR_SUFFIX}')
+
+    @classmethod
+    def __read(cls, path: Path, version: tuple, cache_dir: Path | None) -> GeoDataFrame:
+        sidecar = None if cache_dir is None or not cls.use_sidecar else cls.sidecar_path(path, cache_dir)
+        if sidecar is not None and sidecar.exists():
+            try:
+                return geopandas.read_feather(sidecar, memory_map=True)
+            except (ImportError, OSError, ValueError):
+                pass
+        template = cls.__read_shapefile(path)
+        if sidecar is not None:
+            cls.__write_sidecar(template, sidecar)
+        return template
+
+    @classmethod
+    def __read_shapefile(cls, path: Path) -> GeoDataFrame:
+        template = geopandas.read_file(path)
+        template = template[cls.__ORIGINAL_COLUMNS]
+        return template.rename(
+            columns={
+                'river': WaterNameProperty.dataframe_name(),
+                'name': NameProperty.dataframe_name()
+            }
+        )
+
+    # Sidecars of earlier contents of the same template are removed
+    @staticmethod
+    def __write_sidecar(template: GeoDataFrame, sidecar: Path) -> None:
+        prefix = sidecar.stem.rpartition('_')[0] + '_'
+        try:
+            sidecar.parent.mkdir(parents=True, exist_ok=True)
+            for stale in sidecar.parent.iterdir():
+                if stale.name.startswith(prefix) and stale.suffix == sidecar.suffix:
+                    stale.unlink(missing_ok=True)
+            template.to_feather(sidecar)
+        except (ImportError, OSError):
+            pass
@@ -0,0 +1,139 @@
+import asyncio
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import *
+from shapely.geometry import Point
+from converter import *
+from benchmarks.generators import *
+
+
+def observation(name: str, water_name: str, water_level: str = '100', water_level_change: str = '+1') -> ZSObservationPointDTO:
+    return ZSObservationPointDTO(name=name, water_name=water_name, water_level=water_level,
+                                 water_level_change=water_level_change, ice='чисто', flood_level='500',
+                                 ice_thickness='')
+
+
+def template(*rows: tuple[str, str, Point]) -> GeoDataFrame:
+    return GeoDataFrame({
+        WaterNameProperty.dataframe_name(): [water_name for water_name, _, _ in rows],
+        NameProperty.dataframe_name(): [name for _, name, _ in rows],
+        'geometry': [geometry for _, _, geometry in rows]
+    }, crs='EPSG:4326')
+
+
+class ConverterJoinTest(TestCase):
+
+    def test_first_template_row_wins_on_duplicate_keys(self):
+        converter = Converter(template(('Обь', 'Барнаул', Point(0, 0)), ('Обь', 'Барнаул', Point(1, 1))), dict())
+        result = converter.convert([observation('Барнаул', 'Обь')])
+        self.assertEqual([Point(0, 0)], list(result.geometry))
+
+    def test_later_bulletin_row_overwrites_earlier_one(self):
+        converter = Converter(template(('Обь', 'Барнаул', Point(0, 0))), dict())
+        result = converter.convert([observation('Барнаул', 'Обь', '100'), observation('Барнаул', 'Обь', '200')])
+        self.assertEqual(['200'], list(result[WaterLevelProperty.dataframe_name()]))
+
+    def test_unmatched_stations_are_reported(self):
+        converter = Converter(template(('Обь', 'Барнаул', Point(0, 0))), dict())
+        unmatched = list()
+        result = converter.convert([observation('Барнаул', 'Обь'), observation('Бийск', 'Бия')], unmatched)
+        self.assertEqual([('Бийск', 'Бия')], unmatched)
+        self.assertEqual(['Барнаул'], list(result[NameProperty.dataframe_name()]))
+
+
+class ConverterNullSymbolTest(TestCase):
+
+    TEMPLATE = template(('Обь', 'Барнаул', Point(0, 0)), ('Бия', 'Бийск', Point(1, 1)),
+                        ('Обь', 'Камень-на-Оби', Point(2, 2)))
+    OBSERVATIONS = [observation('Барнаул', 'Обь', '-', '-'), observation('Бийск', 'Бия', '45', '-')]
+
+    def test_rows_with_null_level_and_change_are_dropped(self):
+        result = Converter(self.TEMPLATE, dict(), '-').convert(self.OBSERVATIONS)
+        self.assertEqual(['Бийск'], list(result[NameProperty.dataframe_name()]))
+
+    def test_without_null_symbol_only_bulletin_stations_are_kept(self):
+        result = Converter(self.TEMPLATE, dict()).convert(self.OBSERVATIONS)
+        self.assertEqual(['Барнаул', 'Бийск'], list(result[NameProperty.dataframe_name()]))
+        self.assertEqual(['-', '45'], list(result[WaterLevelProperty.dataframe_name()]))
+
+
+class DocxSniffingTest(TestCase):
+
+    PARSERS = (ParserZS, ParserB, ParserZB, ParserI, ParserOI)
+    POINTS = stations(10)
+
+    def assertSniffed(self, rows: list[list[str]], expected: Type[UGMSParserBase]):
+        tables = docx.Document(io.BytesIO(docx_bytes(rows))).tables
+        self.assertEqual([expected], [parser for parser in self.PARSERS if parser.matches(tables)])
+        self.assertIs(expected, ParseResult.parse(tables, self.PARSERS).parser)
+
+    def test_b_bulletin_is_parsed_by_parser_b(self):
+        self.assertSniffed(b_rows(self.POINTS), ParserB)
+
+    def test_zb_bulletin_is_parsed_by_parser_zb(self):
+        self.assertSniffed(zb_rows(self.POINTS), ParserZB)
+
+    def test_i_bulletin_is_parsed_by_parser_i(self):
+        self.assertSniffed(i_rows(self.POINTS), ParserI)
+
+    def test_bulletin_no_parser_recognizes_is_tried_with_every_parser(self):
+        tables = docx.Document(io.BytesIO(docx_bytes(b_rows(self.POINTS)[1:]))).tables
+        self.assertEqual([], [parser for parser in self.PARSERS if parser.matches(tables)])
+        result = ParseResult.parse(tables, self.PARSERS)
+        self.assertIs(ParserB, result.parser)
+        self.assertEqual(len(self.POINTS), len(result.objects))
+
+
+class ConverterAppProcessPoolTest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.base_dir = Path(cls.temp_dir.name)
+        points = stations(20)
+        write_template(points, cls.base_dir.joinpath('template.shp'))
+        cls.input_dir = cls.base_dir.joinpath('Input')
+        write_bulletins(points, cls.input_dir)
+        cls.input_dir.joinpath('broken.txt').write_bytes(b'not a bulletin')
+        cls.process_pool = ProcessPoolExecutor(max_workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.process_pool.shutdown()
+        cls.temp_dir.cleanup()
+
+    def __run(self, output_name: str, process_pool: ProcessPoolExecutor | None, is_async: bool) -> RunMetrics:
+        filesys = FileSys(self.input_dir, self.base_dir.joinpath(output_name), None, None,
+                          self.base_dir.joinpath('template.shp'), OutputFormat.GEOPARQUET)
+        app = ConverterApp(filesys, '-', None, ParserZS, ParserB, ParserZB, ParserI, ParserOI,
+                           process_pool=process_pool)
+        return asyncio.run(app.convert_async()) if is_async else app.convert()
+
+    def __outputs(self, output_name: str) -> dict[str, GeoDataFrame]:
+        return {path.name: geopandas.read_parquet(path)
+                for path in sorted(self.base_dir.joinpath(output_name).glob('*.parquet'))}
+
+    def assertSameRun(self, expected: RunMetrics, actual: RunMetrics, output_name: str) -> None:
+        self.assertEqual(sorted((file.file, file.ugms_code) for file in expected.files),
+                         sorted((file.file, file.ugms_code) for file in actual.files))
+        self.assertTrue(all(file.stages for file in actual.files))
+        self.assertEqual([(failure.file, failure.stage, failure.message) for failure in expected.failures],
+                         [(failure.file, failure.stage, failure.message) for failure in actual.failures])
+        expected_outputs, actual_outputs = self.__outputs('Output'), self.__outputs(output_name)
+        self.assertEqual(list(expected_outputs), list(actual_outputs))
+        for name, frame in expected_outputs.items():
+            with self.subTest(output=name):
+                self.assertTrue(frame.equals(actual_outputs[name]))
+
+    def test_process_pool_runs_match_in_process_run(self):
+        expected = self.__run('Output', None, False)
+        self.assertEqual(['broken.txt'], [failure.file for failure in expected.failures])
+        for output_name, is_async in (('Output_sync', False), ('Output_async', True)):
+            with self.subTest(output=output_name):
+                self.assertSameRun(expected, self.__run(output_name, self.process_pool, is_async), output_name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest import *
+from documents import *
+
+
+class CountingBackend(DocConverterBackend):
+
+    def __init__(self):
+        self.calls = 0
+
+    def convert(self, file_path: Path) -> bytes:
+        self.calls += 1
+        return b'docx:' + file_path.read_bytes()
+
+
+class DocConversionCacheTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.backend = CountingBackend()
+        self.cache = DocConversionCache(self.root.joinpath('cache'), self.backend)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def __write(self, name: str, content: bytes) -> Path:
+        path = self.root.joinpath(name)
+        path.write_bytes(content)
+        return path
+
+    def test_unchanged_file_is_converted_once(self):
+        file = self.__write('bulletin.doc', b'bulletin')
+        self.assertEqual(b'docx:bulletin', self.cache.convert(file))
+        self.assertEqual(b'docx:bulletin', self.cache.convert(file))
+        self.assertEqual(1, self.backend.calls)
+
+    def test_cache_is_keyed_by_content(self):
+        self.cache.convert(self.__write('first.doc', b'bulletin'))
+        self.cache.convert(self.__write('second.doc', b'bulletin'))
+        self.cache.convert(self.__write('first.doc', b'changed'))
+        self.assertEqual(2, self.backend.calls)
+
+
+class LibreOfficeBackendTest(TestCase):
+
+    # Writes the profile it was given as the converted document
+    FAKE_SOFFICE = '''#!{python}
+import sys
+from pathlib import Path
+profile = next(arg for arg in sys.argv if arg.startswith('-env:UserInstallation='))
+outdir = sys.argv[sys.argv.index('--outdir') + 1]
+Path(outdir).joinpath(Path(sys.argv[-1]).stem + '.docx').write_text(profile.split('=', 1)[1])
+'''
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        executable = self.root.joinpath('soffice')
+        executable.write_text(self.FAKE_SOFFICE.format(python=sys.executable))
+        os.chmod(executable, 0o755)
+        self.backend = LibreOfficeBackend(str(executable))
+        self.file = self.root.joinpath('bulletin.doc')
+        self.file.write_bytes(b'bulletin')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_every_process_has_its_own_profile(self):
+        profile = self.backend.convert(self.file).decode()
+        self.assertTrue(profile.startswith('file://'))
+        self.assertEqual(profile, self.backend.convert(self.file).decode())
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            self.assertNotEqual(profile, pool.submit(self.backend.convert, self.file).result().decode())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import io
+from unittest import *
+import docx
+from benchmarks.generators import *
+from parser import *
+
+
+class SyntheticBulletinTest(TestCase):
+
+    COUNT = 50
+
+    def setUp(self):
+        self.points = stations(self.COUNT)
+
+    def test_zs_bulletin_parses_every_station(self):
+        lines = ParserZS.extract_table(zs_bytes(self.points))
+        parsed = ParserZS.parse(lines)
+        self.assertEqual(self.COUNT, len(parsed))
+        self.assertEqual(self.points[0].bulletin_name, parsed[0].name)
+        self.assertTrue(parsed[0].ice.endswith('у берегов'))
+
+    def test_docx_bulletins_parse_with_their_parsers(self):
+        for parser, rows in ((ParserB, b_rows), (ParserZB, zb_rows), (ParserI, i_rows)):
+            tables = docx.Document(io.BytesIO(docx_bytes(rows(self.points)))).tables
+            self.assertTrue(parser.matches(tables))
+            self.assertEqual([point.bulletin_name for point in self.points],
+                             [point.name for point in parser.parse(tables)])
+
+    def test_oi_sheet_parses_every_station(self):
+        sheet = SyntheticSheet(oi_rows(self.points))
+        self.assertTrue(ParserOI.matches(sheet))
+        self.assertEqual([point.bulletin_name for point in self.points],
+                         [point.name for point in ParserOI.parse(sheet)])
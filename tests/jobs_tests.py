@@ -0,0 +1,119 @@
+import asyncio
+import json
+import tempfile
+import threading
+from pathlib import Path
+from unittest import *
+from unittest import mock
+from jobs import *
+from benchmarks.generators import *
+
+
+class JobManifestTest(TestCase):
+
+    BASE_DIR = Path('base')
+
+    def test_region_with_renames_runs_in_both_modes(self):
+        manifest = JobManifest.from_dict({
+            'template': 'template.shp',
+            'null_symbol': '-',
+            'regions': [{'name': 'zs', 'input': 'zs/Input', 'output': 'zs/Output', 'renames': 'renames.csv'}]
+        }, self.BASE_DIR)
+        self.assertEqual(['zs', 'zs_exp'], [job.name for job in manifest.jobs])
+        self.assertEqual([RenameMode.RENAMES, RenameMode.EXPERIMENTAL], [job.rename_mode for job in manifest.jobs])
+        self.assertEqual([Path('base/zs/Output'), Path('base/zs/Output_exp')], [job.output_dir for job in manifest.jobs])
+        self.assertTrue(all(job.parsers == (ParserZS,) for job in manifest.jobs))
+        self.assertTrue(all(job.null_symbol == '-' for job in manifest.jobs))
+
+    def test_region_without_renames_runs_experimental_only(self):
+        manifest = JobManifest.from_dict({
+            'template': 'template.shp',
+            'regions': [{'name': 'oi', 'input': 'oi/Input', 'output': 'oi/Output'}]
+        }, self.BASE_DIR)
+        self.assertEqual(['oi'], [job.name for job in manifest.jobs])
+        self.assertEqual((ParserOI,), manifest.jobs[0].parsers)
+        self.assertEqual(Path('base/oi/Output'), manifest.jobs[0].output_dir)
+
+    def test_invalid_manifests_are_rejected(self):
+        invalid = [
+            {'template': 't.shp', 'regions': [{'name': 'xx', 'input': 'in', 'output': 'out'}]},
+            {'template': 't.shp', 'regions': [{'name': 'zs', 'input': 'in', 'output': 'out', 'modes': ['renames']}]},
+            {'template': 't.shp', 'regions': [{'name': 'zs', 'input': 'in', 'output': 'out'},
+                                              {'name': 'b', 'input': 'in', 'output': 'out'}]},
+            {'regions': [{'name': 'zs', 'input': 'in', 'output': 'out'}]},
+        ]
+        for data in invalid:
+            with self.assertRaises(InvalidJobManifestException):
+                JobManifest.from_dict(data, self.BASE_DIR)
+
+
+class CountingFileSys(FileSys):
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def counting_reader(self):
+        read_file = FileSys.read_file
+
+        def read(file: Path):
+            with self.lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return read_file(file)
+        return read
+
+    def save(self, geodataframe, name: str, source: BulletinSource = None) -> None:
+        super().save(geodataframe, name, source)
+        with self.lock:
+            self.in_flight -= 1
+
+
+class JobManifestRunTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self.temp_dir.name)
+        points = stations(20)
+        write_template(points, self.base_dir.joinpath('template.shp'))
+        input_dir = self.base_dir.joinpath('zs', 'Input')
+        input_dir.mkdir(parents=True)
+        input_dir.joinpath('good.txt').write_bytes(zs_bytes(points))
+        input_dir.joinpath('bad.txt').write_text('not a bulletin\n', encoding='utf-8')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_failures_are_reported_without_stopping_other_files_and_jobs(self):
+        manifest = JobManifest.from_dict({
+            'template': 'template.shp',
+            'retry_delay': 0,
+            'regions': [{'name': 'zs', 'input': 'zs/Input', 'output': 'zs/Output'},
+                        {'name': 'zs_missing', 'parsers': ['zs'], 'input': 'missing/Input', 'output': 'missing/Output'}]
+        }, self.base_dir)
+        metrics = asyncio.run(manifest.run_async())
+        self.assertEqual(['good.txt'], [file.file for file in metrics.files])
+        self.assertEqual([('zs_missing', 'setup'), ('bad.txt', 'read')],
+                         [(failure.file, failure.stage) for failure in metrics.failures])
+        output_dir = self.base_dir.joinpath('zs', 'Output')
+        self.assertTrue(output_dir.joinpath('good_ZS').exists())
+        report = json.loads(output_dir.joinpath(RunReport.FILE_NAME).read_text(encoding='utf-8'))
+        self.assertEqual(['bad.txt'], [failure['file'] for failure in report['failed']])
+        manifest_files = json.loads(output_dir.joinpath(RunManifest.FILE_NAME).read_text(encoding='utf-8'))
+        self.assertEqual(['good.txt'], [Path(file).name for file in manifest_files])
+
+    def test_pipeline_bounds_files_in_flight(self):
+        input_dir = self.base_dir.joinpath('zs', 'Input')
+        input_dir.joinpath('bad.txt').unlink()
+        for index in range(6):
+            input_dir.joinpath(f'copy{index}.txt').write_bytes(input_dir.joinpath('good.txt').read_bytes())
+        filesys = CountingFileSys(input_dir, self.base_dir.joinpath('out'), None, None,
+                                  self.base_dir.joinpath('template.shp'))
+        app = ConverterApp(filesys, None, None, ParserZS, max_in_flight=2)
+        with mock.patch.object(FileSys, 'read_file', side_effect=filesys.counting_reader()):
+            metrics = asyncio.run(app.convert_async())
+        self.assertEqual(7, len(metrics.files))
+        self.assertEqual([], metrics.failures)
+        self.assertLessEqual(filesys.max_in_flight, 2)
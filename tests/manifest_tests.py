@@ -0,0 +1,80 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import *
+from manifest import *
+from converter import *
+from benchmarks.generators import *
+
+
+class RunManifestTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.input = self.root.joinpath('bulletin.txt')
+        self.input.write_text('bulletin')
+        self.output = self.root.joinpath('bulletin_ZS')
+        self.output.mkdir()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def __key(self, manifest: RunManifest, null_symbol: str = '-') -> ManifestKey:
+        return ManifestKey(content_hash=manifest.content_hash(self.input), parsers='ParserZS',
+                           template_fingerprint='template', rename_fingerprint='renames',
+                           null_symbol=null_symbol, output_format='shp')
+
+    def test_recorded_input_is_current_after_reload(self):
+        manifest = RunManifest(self.root)
+        manifest.record(self.input, self.__key(manifest), 'ZS', self.output)
+        manifest.save()
+        reloaded = RunManifest(self.root)
+        self.assertTrue(reloaded.is_current(self.input, self.__key(reloaded)))
+
+    def test_changed_settings_or_content_are_not_current(self):
+        manifest = RunManifest(self.root)
+        manifest.record(self.input, self.__key(manifest), 'ZS', self.output)
+        self.assertFalse(manifest.is_current(self.input, self.__key(manifest, null_symbol='*')))
+        self.input.write_text('changed bulletin')
+        self.assertFalse(manifest.is_current(self.input, self.__key(manifest)))
+
+    def test_missing_output_is_not_current(self):
+        manifest = RunManifest(self.root)
+        manifest.record(self.input, self.__key(manifest), 'ZS', self.output)
+        self.output.rmdir()
+        self.assertFalse(manifest.is_current(self.input, self.__key(manifest)))
+
+
+class ConverterAppManifestTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.points = stations(5)
+        self.template_path = write_template(self.points, self.root.joinpath('template.shp'))
+        input_dir = self.root.joinpath('Input')
+        input_dir.mkdir()
+        input_dir.joinpath('bulletin.txt').write_bytes(zs_bytes(self.points))
+        self.filesys = FileSys(input_dir, self.root.joinpath('Output'), None, None, self.template_path)
+
+    def tearDown(self):
+        TemplateRegistry.clear()
+        self.temp_dir.cleanup()
+
+    def __convert(self) -> list[str]:
+        return [file.file for file in ConverterApp(self.filesys, None, None, ParserZS).convert().files]
+
+    def test_unchanged_template_skips_converted_input(self):
+        self.assertEqual(['bulletin.txt'], self.__convert())
+        self.assertEqual([], self.__convert())
+
+    def test_edited_template_geometry_converts_input_again(self):
+        self.assertEqual(['bulletin.txt'], self.__convert())
+        moved = [dataclasses.replace(point, x=point.x + 1) for point in self.points]
+        write_template(moved, self.template_path)
+        self.assertEqual(['bulletin.txt'], self.__convert())
+
+
+if __name__ == '__main__':
+    unittest.main()
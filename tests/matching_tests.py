@@ -0,0 +1,105 @@
+import json
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest import *
+from matching import *
+
+
+class NGramIndexTest(TestCase):
+
+    def setUp(self):
+        self.index = NGramIndex(['Барнаул', 'Бийск', 'Камень-на-Оби', 'Новосибирск', 'Бийск'], limit=2)
+
+    def test_candidates_are_ranked_by_shared_grams(self):
+        self.assertEqual('Камень-на-Оби', self.index.candidates('Камень')[0])
+
+    def test_candidates_are_limited(self):
+        self.assertEqual(2, len(self.index.candidates('Бийск Барнаул')))
+
+    def test_values_are_unique(self):
+        self.assertEqual(['Барнаул', 'Бийск', 'Камень-на-Оби', 'Новосибирск'], self.index.values)
+
+    def test_word_without_shared_grams_falls_back_to_all_values(self):
+        self.assertEqual(['Барнаул', 'Бийск', 'Камень-на-Оби', 'Новосибирск'], self.index.candidates('Бк'))
+
+
+class TemplateIndexTest(TestCase):
+
+    def setUp(self):
+        self.index = TemplateIndex(['Обь', 'Бия', 'Обь'], ['Барнаул', 'Бийск', 'Камень-на-Оби'])
+
+    def test_names_of_water(self):
+        self.assertEqual({'Барнаул', 'Камень-на-Оби'}, self.index.names_of('Обь'))
+
+    def test_waters_of_name(self):
+        self.assertEqual({'Бия'}, self.index.waters_of('Бийск'))
+
+    def test_unknown_value_has_no_pairs(self):
+        self.assertEqual(frozenset(), self.index.names_of('Катунь'))
+
+
+def save_matches(path: Path, fingerprint: str, worker: int) -> None:
+    for index in range(20):
+        cache = MatchCache(path, fingerprint)
+        cache[(f'Пост{worker}_{index}', 'Обь')] = (f'Пост{worker}', 'Обь')
+        cache.save()
+
+
+class MatchCacheTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name).joinpath('match_cache.json')
+        self.fingerprint = MatchCache.fingerprint(['Обь'], ['Барнаул'])
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_saved_matches_are_loaded(self):
+        cache = MatchCache(self.path, self.fingerprint)
+        cache[('Барнаулл', 'р.Обь')] = ('Барнаул', 'Обь')
+        cache[('Бийск', 'Бия')] = None
+        cache.save()
+        loaded = MatchCache(self.path, self.fingerprint)
+        self.assertEqual(('Барнаул', 'Обь'), loaded[('Барнаулл', 'р.Обь')])
+        self.assertIn(('Бийск', 'Бия'), loaded)
+        self.assertIsNone(loaded[('Бийск', 'Бия')])
+
+    def test_changed_template_invalidates_matches(self):
+        cache = MatchCache(self.path, self.fingerprint)
+        cache[('Барнаулл', 'р.Обь')] = ('Барнаул', 'Обь')
+        cache.save()
+        other = MatchCache(self.path, MatchCache.fingerprint(['Обь', 'Бия'], ['Барнаул', 'Бийск']))
+        self.assertNotIn(('Барнаулл', 'р.Обь'), other)
+
+    def test_sections_of_earlier_templates_are_kept(self):
+        cache = MatchCache(self.path, self.fingerprint)
+        cache[('Барнаулл', 'р.Обь')] = ('Барнаул', 'Обь')
+        cache.save()
+        other = MatchCache(self.path, MatchCache.fingerprint(['Обь', 'Бия'], ['Барнаул', 'Бийск']))
+        other[('Бийскк', 'Бия')] = ('Бийск', 'Бия')
+        other.save()
+        self.assertEqual(('Барнаул', 'Обь'), MatchCache(self.path, self.fingerprint)[('Барнаулл', 'р.Обь')])
+
+    def test_least_recently_saved_sections_are_dropped(self):
+        fingerprints = [MatchCache.fingerprint(['Обь'], [f'Пост{index}']) for index in range(4)]
+        for fingerprint in fingerprints + fingerprints[:1]:
+            cache = MatchCache(self.path, fingerprint, max_sections=3)
+            cache[('Барнаулл', 'р.Обь')] = ('Барнаул', 'Обь')
+            cache.save()
+        sections = json.loads(self.path.read_text(encoding='utf-8'))
+        self.assertEqual([fingerprints[2], fingerprints[3], fingerprints[0]], list(sections))
+
+    def test_concurrent_saves_keep_every_match(self):
+        with ProcessPoolExecutor(4) as pool:
+            list(pool.map(save_matches, [self.path] * 4, [self.fingerprint] * 4, range(4)))
+        cache = MatchCache(self.path, self.fingerprint)
+        for worker in range(4):
+            for index in range(20):
+                self.assertIn((f'Пост{worker}_{index}', 'Обь'), cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import tempfile
+from pathlib import Path
+from unittest import *
+from metrics import *
+from converter import *
+from benchmarks.generators import *
+
+
+class MetricsTest(TestCase):
+
+    def test_recorder_traces_memory_only_when_enabled(self):
+        with MemoryTracing.enabled():
+            recorder = StageRecorder(trace_memory=True)
+            with recorder.stage('parse'):
+                data = [str(i) for i in range(10000)]
+            untraced = StageRecorder()
+            with untraced.stage('parse'):
+                data = list(data)
+        self.assertEqual(['parse'], [stage.stage for stage in recorder.stages])
+        self.assertGreater(recorder.stages[0].memory_peak, 0)
+        self.assertGreaterEqual(recorder.stages[0].wall_time, 0)
+        self.assertIsNone(untraced.stages[0].memory_peak)
+
+    def test_export_writes_prometheus_and_json_lines(self):
+        metrics = RunMetrics([FileMetrics('a "1".txt', 'ZS', [StageMetrics('read', 0.5, 0.25),
+                                                             StageMetrics('write', 1.0, 0.5)])])
+        with tempfile.TemporaryDirectory() as directory:
+            prometheus = Path(directory).joinpath('metrics.prom')
+            json_lines = Path(directory).joinpath('metrics.jsonl')
+            metrics.export(prometheus)
+            metrics.export(json_lines)
+            metrics.export(json_lines)
+            self.assertIn('planet_converter_stage_wall_seconds{output_dir="",file="a \\"1\\".txt",ugms_code="ZS",'
+                          'stage="read"} 0.5',
+                          prometheus.read_text(encoding='utf-8'))
+            self.assertNotIn('memory_peak_bytes{', prometheus.read_text(encoding='utf-8'))
+            self.assertEqual(2, len(json_lines.read_text(encoding='utf-8').splitlines()))
+        self.assertEqual(1.5, metrics.files[0].wall_time)
+        self.assertEqual(0.75, metrics.totals()['read'].cpu_time + metrics.totals()['write'].cpu_time)
+
+
+class MergedRunsPrometheusTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        points = stations(5)
+        self.template_path = write_template(points, self.root.joinpath('template.shp'))
+        self.input_dir = self.root.joinpath('Input')
+        self.input_dir.mkdir()
+        self.input_dir.joinpath('bulletin.txt').write_bytes(zs_bytes(points))
+
+    def tearDown(self):
+        TemplateRegistry.clear()
+        self.temp_dir.cleanup()
+
+    def __run(self, output_name: str) -> RunMetrics:
+        filesys = FileSys(self.input_dir, self.root.joinpath(output_name), None, None, self.template_path)
+        return ConverterApp(filesys, None, None, ParserZS).convert()
+
+    def __series(self, metrics: RunMetrics) -> list[str]:
+        path = self.root.joinpath('metrics.prom')
+        metrics.write_prometheus(path)
+        return [line.rsplit(' ', 1)[0] for line in path.read_text(encoding='utf-8').splitlines()
+                if not line.startswith('#')]
+
+    def test_runs_over_the_same_file_keep_distinct_series(self):
+        merged = RunMetrics.merge([self.__run('First'), self.__run('Second')])
+        series = self.__series(merged)
+        self.assertEqual(len(series), len(set(series)))
+        for output_name in ('First', 'Second'):
+            output_dir = str(self.root.joinpath(output_name)).replace('\\', '\\\\')
+            self.assertTrue(any(f'output_dir="{output_dir}"' in line for line in series))
+
+    def test_same_label_set_is_aggregated(self):
+        run = RunMetrics([FileMetrics('a.txt', 'ZS', [StageMetrics('read', 0.5, 0.25, 10)], 'Output')])
+        path = self.root.joinpath('metrics.prom')
+        RunMetrics.merge([run, run]).write_prometheus(path)
+        content = path.read_text(encoding='utf-8')
+        self.assertIn('planet_converter_stage_wall_seconds{output_dir="Output",file="a.txt",ugms_code="ZS",'
+                      'stage="read"} 1.0', content)
+        self.assertIn('planet_converter_stage_memory_peak_bytes{output_dir="Output",file="a.txt",ugms_code="ZS",'
+                      'stage="read"} 10', content)
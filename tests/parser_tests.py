@@ -1,7 +1,9 @@
 import unittest
+from pathlib import Path
 from unittest import *
 from parser import *
 from test_api import *
+from benchmarks.generators import *
 
 
 class ParserZSTest(TestCase):
@@ -29,11 +31,132 @@ class ParserZSTest(TestCase):
         self.assertRaises(MissingColumnException, ParserZS.parse, given)
 
 
+class ParserZSExtractTableTest(TestCase):
+
+    START_LINE = ':-------------+--------------+---------+--------+--------+--------+---------+-------------------:--------:\n'
+    END_LINE = '----------------------------------------------------------------------------------------------------------\n'
+    ROW = ': р.Обь      : Барнаул     :     123:    +5: x : y : z : ледостав         :    500:\n'
+
+    def test_only_table_region_is_decoded(self):
+        text = 'шапка\n' + self.START_LINE + self.ROW + self.END_LINE + 'подвал\n'
+        self.assertEqual([self.START_LINE, self.ROW, self.END_LINE], ParserZS.extract_table(text.encode('utf-8')))
+
+    def test_legacy_encodings_are_sniffed(self):
+        text = self.START_LINE + self.ROW + self.END_LINE
+        for encoding in ('cp866', 'cp1251'):
+            content = text.replace('\n', '\r\n').encode(encoding)
+            self.assertEqual([self.START_LINE, self.ROW, self.END_LINE], ParserZS.extract_table(content))
+
+    def test_region_longer_than_sniffed_sample_is_decoded_whole(self):
+        rows = [self.ROW] * 2000
+        for encoding in ('cp866', 'cp1251'):
+            content = ''.join([self.START_LINE] + rows + [self.END_LINE]).encode(encoding)
+            self.assertEqual([self.START_LINE] + rows + [self.END_LINE], ParserZS.extract_table(content))
+
+    def test_missing_table_lines_throw_exception(self):
+        self.assertRaises(StartLineNotPresentException, ParserZS.extract_table, ('шапка\n' + self.ROW).encode('utf-8'))
+        self.assertRaises(EndLineNotPresentException, ParserZS.extract_table,
+                          (self.START_LINE + self.ROW).encode('utf-8'))
+
+
+class ParserZSTableTest(TestCase):
+
+    ROW = ParserZSExtractTableTest.ROW
+
+    @classmethod
+    def continuation(cls, ice: str) -> str:
+        parts = cls.ROW.split(':')
+        cells = [part if index in (0, 10) else ' ' * len(part) for index, part in enumerate(parts)]
+        cells[8] = f' {ice}'.ljust(len(parts[8]))
+        return ':'.join(cells)
+
+    @classmethod
+    def table(cls, rows: list[str]) -> list[str]:
+        return [ParserZSExtractTableTest.START_LINE, *rows, ParserZSExtractTableTest.END_LINE]
+
+    def test_consecutive_continuation_lines_are_merged(self):
+        rows = [self.ROW, self.continuation('у берегов'), self.continuation('забереги')] * 40
+        ragged = list(rows)
+        ragged[0] = ragged[0].replace('    500:', '500:')
+        for content in (self.table(rows), self.table(ragged)):
+            batch = ParserZS.parse_batch(content)
+            self.assertEqual(['Обь'] * 40, list(batch.column('water_name')))
+            self.assertEqual(['Барнаул'] * 40, list(batch.column('name')))
+            self.assertEqual(['ледостав у берегов забереги'] * 40, list(batch.column('ice')))
+            self.assertEqual(['500'] * 40, list(batch.column('flood_level')))
+
+    def test_line_with_extra_column_throws_exception(self):
+        rows = [self.ROW] * 100
+        rows[50] = self.ROW.replace(' x ', ' : ')
+        self.assertRaises(MissingColumnException, ParserZS.parse_batch, self.table(rows))
+
+
+
+class ParserZSFixedLayoutTest(TestCase):
+
+    FIXTURES = Path(__file__).parent.joinpath('test_files', 'zs')
+    START_LINE = ParserZSExtractTableTest.START_LINE
+    END_LINE = ParserZSExtractTableTest.END_LINE
+
+    # Short tables are repeated, so that they are long enough to be cut as a fixed layout. One space more in the ice
+    # cell of the last line, which is stripped anyway, breaks the layout and makes the same table split line by line.
+    def assertSameAsLineSplit(self, file_content: list[str]) -> None:
+        rows = file_content[file_content.index(self.START_LINE) + 1:file_content.index(self.END_LINE)]
+        rows = rows * -(-100 // len(rows))
+        cells = rows[-1].split(':')
+        cells[8] += ' '
+        fixed = ParserZS.parse([self.START_LINE] + rows + [self.END_LINE])
+        self.assertTrue(fixed)
+        self.assertEqual(ParserZS.parse([self.START_LINE] + rows[:-1] + [':'.join(cells), self.END_LINE]), fixed)
+
+    def test_fixed_layout_matches_line_split_on_fixtures(self):
+        for fixture in sorted(self.FIXTURES.glob('given_valid_*.txt')):
+            with self.subTest(fixture=fixture.name):
+                self.assertSameAsLineSplit(ParserZSTestSource(str(self.FIXTURES)).get_given(fixture.name))
+
+    def test_fixed_layout_matches_line_split_on_synthetic_bulletin(self):
+        self.assertSameAsLineSplit(zs_lines(stations(5000)))
+
+    def test_fixed_layout_matches_line_split_with_river_prefix_and_continuation_lines(self):
+        row = ParserZSExtractTableTest.ROW
+        continuation = row.replace(' р.Обь   ', '         ').replace(' Барнаул     ', '             ')
+        river = row.replace('р.Обь   ', 'оз.Чаны ').replace('ледостав         ', 'р.забереги       ')
+        self.assertSameAsLineSplit([self.START_LINE, continuation, row, continuation, continuation, river, row,
+                                    self.END_LINE])
+
+
+class ParserSniffingTest(TestCase):
+
+    LINES = [ParserZSExtractTableTest.START_LINE, ParserZSExtractTableTest.ROW, ParserZSExtractTableTest.END_LINE]
+
+    def test_zs_recognizes_only_text_with_start_line(self):
+        self.assertTrue(ParserZS.matches(list(self.LINES)))
+        self.assertFalse(ParserZS.matches(self.LINES[1:]))
+        self.assertFalse(ParserOI.matches(list(self.LINES)))
+        self.assertFalse(ParserB.matches(list(self.LINES)))
+
+    def test_zs_parse_does_not_modify_content(self):
+        content = list(self.LINES)
+        ParserZS.parse(content)
+        self.assertEqual(self.LINES, content)
+
+
 class EntitiesTest(TestCase):
 
     def test_get_water_name_codename(self):
         self.assertEqual('River', WaterNameProperty.dataframe_name())
 
+    def test_batch_round_trips_points(self):
+        points = [ZSObservationPointDTO(name='Барнаул', water_name='Обь', water_level='123',
+                                        water_level_change='+5', ice='', flood_level='500', ice_thickness='')]
+        self.assertEqual(points, ObservationBatch.from_points(points).to_points())
+
+    def test_batch_frame_uses_dataframe_names(self):
+        points = [OIObservationPointDTO(name='Барнаул', water_name='Обь', water_level='123',
+                                        water_level_change='+5', flood_level='500', floodplain_level='', ice='')]
+        frame = ObservationBatch.from_points(points).to_frame()
+        self.assertEqual(list(points[0].to_dataframe_dict()), list(frame.columns))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,47 @@
+import pstats
+import tempfile
+import time
+from pathlib import Path
+from unittest import *
+from profiling import *
+
+
+def busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class FileProfilerTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.options = ProfilingOptions(Path(self.temp_dir.name), files=('*.txt',), stages=('parse', 'write'),
+                                        sample_interval=0.001)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_only_selected_files_are_profiled(self):
+        self.assertIsNone(FileProfiler.create(self.options, Path('bulletin.docx')))
+        self.assertIsNone(FileProfiler.create(None, Path('bulletin.txt')))
+        self.assertIsNotNone(FileProfiler.create(self.options, Path('bulletin.txt')))
+
+    def test_selected_stages_are_dumped_and_merged(self):
+        profiler = FileProfiler.create(self.options, Path('bulletin.txt'))
+        with profiler.stage('read'):
+            busy(0.02)
+        with profiler.stage('parse'):
+            busy(0.05)
+        profiler.dump()
+        writer = FileProfiler.create(self.options, Path('bulletin.txt'))
+        with writer.stage('write'):
+            busy(0.02)
+        writer.dump(merge=True)
+        stats = pstats.Stats(str(profiler.stats_path))
+        calls = {function[2]: stat[0] for function, stat in stats.stats.items()}
+        self.assertEqual(2, calls['busy'])
+        collapsed = profiler.collapsed_path.read_text(encoding='utf-8').splitlines()
+        self.assertTrue(collapsed)
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit() for line in collapsed))
+        self.assertTrue(any('busy (profiling_tests.py' in line for line in collapsed))
@@ -0,0 +1,48 @@
+import csv
+import json
+import tempfile
+from pathlib import Path
+from unittest import *
+from exceptions import *
+from reports import *
+
+
+class UnmatchedReportTest(TestCase):
+
+    UNMATCHED = [('Пост', 'Река'), ('Пост', 'Река'), ('Другой', 'Обь')]
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_csv_report_lists_each_station_once(self):
+        report = UnmatchedReport(self.output_dir)
+        path = report.write('bulletin_ZS', Path('bulletin.txt'), 'ZS', self.UNMATCHED)
+        with open(path, encoding='utf-8', newline='') as file:
+            rows = list(csv.reader(file, delimiter=';'))
+        self.assertEqual(['name', 'water_name', 'file', 'ugms_code'], rows[0])
+        self.assertEqual([['Пост', 'Река', 'bulletin.txt', 'ZS'], ['Другой', 'Обь', 'bulletin.txt', 'ZS']], rows[1:])
+
+    def test_json_report_is_removed_once_everything_matches(self):
+        report = UnmatchedReport(self.output_dir, ReportFormat.JSON)
+        path = report.write('bulletin_ZS', Path('bulletin.txt'), 'ZS', self.UNMATCHED)
+        self.assertEqual(2, len(json.loads(path.read_text(encoding='utf-8'))['unmatched']))
+        self.assertIsNone(report.write('bulletin_ZS', Path('bulletin.txt'), 'ZS', []))
+        self.assertFalse(path.exists())
+
+
+class RunReportTest(TestCase):
+
+    def test_report_lists_converted_and_failed_files(self):
+        error = UnknownFormatException()
+        FileFailure.mark_stage(error, 'parse')
+        FileFailure.mark_stage(error, 'join')
+        metrics = RunMetrics([FileMetrics('good.txt', 'ZS')], [FileFailure.of('bad.txt', error)])
+        with tempfile.TemporaryDirectory() as directory:
+            report = json.loads(RunReport(Path(directory)).write(metrics).read_text(encoding='utf-8'))
+        self.assertEqual([{'file': 'good.txt', 'ugms_code': 'ZS'}], report['converted'])
+        self.assertEqual([{'file': 'bad.txt', 'stage': 'parse', 'error': 'UnknownFormatException',
+                           'message': 'None of the provided parsers can parse', 'attempts': 1}], report['failed'])
@@ -0,0 +1,39 @@
+import asyncio
+from unittest import *
+from retry import *
+
+
+class RetryPolicyTest(TestCase):
+
+    def setUp(self):
+        self.calls = 0
+
+    def flaky(self, failures: int, error: Exception) -> str:
+        self.calls += 1
+        if self.calls <= failures:
+            raise error
+        return 'done'
+
+    def test_transient_errors_are_retried_with_backoff(self):
+        policy = RetryPolicy(attempts=4, delay=0.001, backoff=3.0)
+        self.assertEqual([0.001, 0.003, 0.009], [round(delay, 6) for delay in policy.delays()])
+        self.assertEqual('done', policy.call(self.flaky, 2, PermissionError('locked')))
+        self.assertEqual(3, self.calls)
+
+    def test_permanent_errors_fail_on_first_attempt(self):
+        policy = RetryPolicy(attempts=3, delay=0.001)
+        for error in (FileNotFoundError('missing'), UnknownFormatException()):
+            self.calls = 0
+            with self.assertRaises(type(error)) as raised:
+                policy.call(self.flaky, 5, error)
+            self.assertEqual(1, self.calls)
+            self.assertEqual(1, raised.exception.attempts)
+
+    def test_async_call_gives_up_after_last_attempt(self):
+        async def flaky_async():
+            return self.flaky(5, DocConversionException())
+
+        with self.assertRaises(DocConversionException) as raised:
+            asyncio.run(RetryPolicy(attempts=2, delay=0.001).call_async(flaky_async))
+        self.assertEqual(2, self.calls)
+        self.assertEqual(2, raised.exception.attempts)
@@ -0,0 +1,63 @@
+import io
+import json
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from unittest import *
+from serialization import *
+from test_api import *
+
+
+@dataclass
+class TypedObservationPointDTO(ObservationPointDTOBase):
+    water_level: float
+    ice: str | None
+
+    def to_dataframe_dict(self):
+        return {NameProperty.dataframe_name(): self.name, WaterNameProperty.dataframe_name(): self.water_name,
+                WaterLevelProperty.dataframe_name(): self.water_level, IceProperty.dataframe_name(): self.ice}
+
+
+class ObservationSerializationTest(TestCase):
+
+    POINTS = [
+        ZSObservationPointDTO(name='Бийск', water_name='Бия', water_level='45', water_level_change='-1',
+                              ice='чисто', flood_level='300', ice_thickness=''),
+        ZSObservationPointDTO(name='Барнаул "центр"', water_name='Обь', water_level='123', water_level_change='+5',
+                              ice='ледостав; у берегов', flood_level='500', ice_thickness=None),
+    ]
+
+    def test_ndjson_matches_dataclass_encoder(self):
+        buffer = io.StringIO()
+        self.assertEqual(2, ObservationWriter.write(self.POINTS, buffer, ObservationFormat.NDJSON))
+        records = [json.loads(line) for line in buffer.getvalue().splitlines()]
+        self.assertEqual(json.loads(json.dumps(self.POINTS, cls=DataclassJSONEncoder)), records)
+        buffer.seek(0)
+        self.assertEqual(self.POINTS, ObservationReader.read_points(buffer, ZSObservationPointDTO,
+                                                                    ObservationFormat.NDJSON))
+
+    def test_csv_round_trip_of_batch(self):
+        batch = ObservationBatch.from_points(self.POINTS[:1])
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory).joinpath('expected.csv')
+            ObservationWriter.write(batch, path)
+            header = path.read_text(encoding='utf-8').splitlines()[0]
+            loaded = ObservationReader.read(path, ZSObservationPointDTO)
+        self.assertEqual(';'.join(ZSObservationPointDTO.dataframe_fields().values()), header)
+        self.assertEqual(self.POINTS[:1], loaded.to_points())
+
+    def test_csv_cells_are_converted_with_field_types(self):
+        points = [TypedObservationPointDTO(name='Бийск', water_name='Бия', water_level=45.5, ice=None),
+                  TypedObservationPointDTO(name='Барнаул', water_name='Обь', water_level=123.0, ice='')]
+        buffer = io.StringIO()
+        ObservationWriter.write(points, buffer, ObservationFormat.CSV)
+        buffer.seek(0)
+        loaded = ObservationReader.read_points(buffer, TypedObservationPointDTO, ObservationFormat.CSV)
+        self.assertEqual([points[0], TypedObservationPointDTO(name='Барнаул', water_name='Обь', water_level=123.0,
+                                                              ice=None)], loaded)
+
+    def test_test_source_loads_ndjson_corpus(self):
+        with tempfile.TemporaryDirectory() as directory:
+            ObservationWriter.write(self.POINTS, Path(directory).joinpath('expected.ndjson'))
+            expected = ParserZSTestSource(directory).get_expected('expected.ndjson')
+        self.assertEqual(self.POINTS, expected)
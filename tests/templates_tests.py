@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import *
+from unittest import mock
+from templates import *
+from benchmarks.generators import *
+
+
+class TemplateRegistryTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.template_path = write_template(stations(5), Path(self.temp_dir.name).joinpath('template.shp'))
+        self.cache_dir = Path(self.temp_dir.name).joinpath('cache')
+        TemplateRegistry.clear()
+
+    def tearDown(self):
+        TemplateRegistry.clear()
+        self.temp_dir.cleanup()
+
+    def test_sidecar_is_written_to_cache_dir(self):
+        TemplateRegistry.load(self.template_path, self.cache_dir)
+        self.assertTrue(TemplateRegistry.sidecar_path(self.template_path, self.cache_dir).exists())
+        self.assertEqual([], list(self.template_path.parent.glob('*.feather')))
+
+    def test_unchanged_template_is_read_from_sidecar(self):
+        expected = TemplateRegistry.load(self.template_path, self.cache_dir)
+        TemplateRegistry.clear()
+        with mock.patch.object(geopandas, 'read_file', side_effect=AssertionError('template was read again')):
+            template = TemplateRegistry.load(self.template_path, self.cache_dir)
+        self.assertEqual(list(expected[NameProperty.dataframe_name()]), list(template[NameProperty.dataframe_name()]))
+
+    def test_changed_template_invalidates_sidecar(self):
+        TemplateRegistry.load(self.template_path, self.cache_dir)
+        TemplateRegistry.clear()
+        points = stations(3, seed=1)
+        write_template(points[:1], self.template_path)
+        template = TemplateRegistry.load(self.template_path, self.cache_dir)
+        self.assertEqual([points[0].name], list(template[NameProperty.dataframe_name()]))
+        self.assertEqual([TemplateRegistry.sidecar_path(self.template_path, self.cache_dir)],
+                         list(self.cache_dir.glob('*.feather')))
+
+    def test_template_replaced_by_older_copy_invalidates_sidecar(self):
+        points = stations(3, seed=1)
+        older_dir = Path(self.temp_dir.name).joinpath('older')
+        older_dir.mkdir()
+        older_path = write_template(points[:1], older_dir.joinpath('template.shp'))
+        TemplateRegistry.load(self.template_path, self.cache_dir)
+        TemplateRegistry.clear()
+        for part in older_path.parent.iterdir():
+            os.utime(part, ns=(10 ** 18, 10 ** 18))
+            os.replace(part, self.template_path.with_suffix(part.suffix))
+        template = TemplateRegistry.load(self.template_path, self.cache_dir)
+        self.assertEqual([points[0].name], list(template[NameProperty.dataframe_name()]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@ from typing import Any
 from abc import ABC
 from abc import abstractmethod
 from entities import *
+from serialization import *
 
 
 class TestSource(ABC):
@@ -22,6 +23,9 @@ class TestSource(ABC):
     def get_expected(self, file_name: str) -> Any:
         pass
 
+    def _read_observations(self, file_name: str, point_type: type[ObservationPointDTOBase]) -> list[ObservationPointDTOBase]:
+        return ObservationReader.read_points(self._root_dir.joinpath(file_name), point_type)
+
     def _read_file(self, file_name: str) -> list[str]:
         with open(self._root_dir.joinpath(file_name), 'r') as file:
             lines = file.readlines()
@@ -43,6 +47,8 @@ class ParserZSTestSource(TestSource):
         return self._read_file(file_name)
 
     def get_expected(self, file_name: str) -> list[ZSObservationPointDTO]:
+        if Path(file_name).suffix in ('.ndjson', '.csv'):
+            return self._read_observations(file_name, ZSObservationPointDTO)
         plain_text_lines = self._read_file(file_name)
         plain_text = ''.join(map(str, plain_text_lines))
         json_data = json.loads(plain_text)
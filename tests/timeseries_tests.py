@@ -0,0 +1,92 @@
+import os
+import tempfile
+from datetime import date, datetime
+from pathlib import Path
+from unittest import *
+from shapely.geometry import Point
+from timeseries import *
+from converter import *
+from benchmarks.generators import *
+
+
+class BulletinSourceTest(TestCase):
+
+    def test_date_is_taken_from_file_name(self):
+        self.assertEqual(date(2024, 4, 12), BulletinSource.date_of(Path('bulletin_2024-04-12.txt')))
+        self.assertEqual(date(2024, 4, 12), BulletinSource.date_of(Path('20240412_ZS.txt')))
+        self.assertEqual(date(2024, 4, 12), BulletinSource.date_of(Path('Бюллетень 12.04.2024.docx')))
+        self.assertEqual(date(2024, 4, 2), BulletinSource.date_of(Path('Бюллетень 2.4.24.doc')))
+
+    def test_modification_date_is_used_without_date_in_name(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file = Path(directory).joinpath('bulletin 99.99.2024.txt')
+            file.write_text('', encoding='utf-8')
+            modified = datetime(2024, 4, 12, 12).timestamp()
+            os.utime(file, (modified, modified))
+            self.assertEqual(date(2024, 4, 12), BulletinSource.date_of(file))
+
+
+class TimeSeriesStoreTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = TimeSeriesStore(Path(self.temp_dir.name).joinpath(TimeSeriesStore.DIRECTORY))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def frame(level: str) -> GeoDataFrame:
+        return GeoDataFrame({'name': ['Бийск'], 'level': [level], 'geometry': [Point(85, 52)]}, crs='EPSG:4326')
+
+    def test_appending_a_day_keeps_earlier_partitions(self):
+        first = self.store.append(self.frame('100'), BulletinSource(Path('a.txt'), 'ZS', date(2024, 4, 12)))
+        first_mtime = first.stat().st_mtime_ns
+        second = self.store.append(self.frame('110'), BulletinSource(Path('b.txt'), 'ZS', date(2024, 4, 13)))
+        self.store.append(self.frame('5'), BulletinSource(Path('c.docx'), 'B', date(2024, 4, 13)))
+        self.assertEqual(first_mtime, first.stat().st_mtime_ns)
+        self.assertEqual(Path('ugms_code=ZS', 'bulletin_date=2024-04-13', 'b.parquet'),
+                         second.relative_to(self.store.root))
+        self.assertEqual([('B', date(2024, 4, 13)), ('ZS', date(2024, 4, 12)), ('ZS', date(2024, 4, 13))],
+                         self.store.partitions())
+        self.assertEqual([], list(self.store.root.rglob('.*')))
+
+    def test_rows_carry_source_file_and_bulletin_date(self):
+        self.store.append(self.frame('100'), BulletinSource(Path('a.txt'), 'ZS', date(2024, 4, 12)))
+        self.store.append(self.frame('110'), BulletinSource(Path('b.txt'), 'ZS', date(2024, 4, 13)))
+        self.store.append(self.frame('120'), BulletinSource(Path('b.txt'), 'ZS', date(2024, 4, 13)))
+        rows = self.store.read('ZS', start=date(2024, 4, 13))
+        self.assertEqual(['120'], rows['level'].tolist())
+        self.assertEqual(['b.txt'], rows['source_file'].tolist())
+        self.assertEqual([date(2024, 4, 13)], rows['bulletin_date'].tolist())
+        self.assertEqual(2, len(self.store.read()))
+        self.assertIsNone(self.store.read('OI'))
+
+
+class ConverterAppTimeSeriesTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.points = stations(5)
+        self.input_dir = self.root.joinpath('Input')
+        self.input_dir.mkdir()
+        self.output_dir = self.root.joinpath('Output')
+        self.filesys = FileSys(self.input_dir, self.output_dir, None, None,
+                               write_template(self.points, self.root.joinpath('template.shp')),
+                               output_format=OutputFormat.TIMESERIES)
+
+    def tearDown(self):
+        TemplateRegistry.clear()
+        self.temp_dir.cleanup()
+
+    def test_bulletins_are_appended_to_daily_partitions(self):
+        for name in ('bulletin_2024-04-12.txt', 'bulletin_2024-04-13.txt'):
+            self.input_dir.joinpath(name).write_bytes(zs_bytes(self.points))
+        metrics = ConverterApp(self.filesys, None, None, ParserZS).convert()
+        self.assertEqual([], metrics.failures)
+        store = TimeSeriesStore(self.output_dir.joinpath(TimeSeriesStore.DIRECTORY))
+        self.assertEqual([('ZS', date(2024, 4, 12)), ('ZS', date(2024, 4, 13))], store.partitions())
+        rows = store.read('ZS', start=date(2024, 4, 13))
+        self.assertEqual(sorted(point.name for point in self.points), sorted(rows[NameProperty.dataframe_name()]))
+        self.assertEqual({'bulletin_2024-04-13.txt'}, set(rows[TimeSeriesStore.SOURCE_COLUMN]))
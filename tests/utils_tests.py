@@ -0,0 +1,59 @@
+import contextlib
+import io
+import tempfile
+import threading
+from pathlib import Path
+from unittest import *
+from unittest import mock
+from utils import *
+
+
+class BufferedLoggerTest(TestCase):
+
+    def test_messages_are_written_to_console_and_file_in_order(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = Path(directory).joinpath('converter.log')
+            console = io.StringIO()
+            with contextlib.redirect_stdout(console):
+                logger = BufferedLogger(file_path=log_path, batch_size=16, flush_interval=0.01)
+                for i in range(100):
+                    logger.log_nowait(f'message {i}')
+                asyncio.run(logger.log('async message'))
+                logger.flush()
+                logger.close()
+            expected = [f'message {i}' for i in range(100)] + ['async message']
+            self.assertEqual(expected, console.getvalue().splitlines())
+            logged = log_path.read_text(encoding='utf-8').splitlines()
+            self.assertEqual(expected, [line.split(' ', 2)[2] for line in logged])
+
+    def test_file_is_rotated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = Path(directory).joinpath('converter.log')
+            logger = BufferedLogger(console=False, file_path=log_path, max_bytes=1024, backup_count=2,
+                                    batch_size=4, flush_interval=0.01)
+            for i in range(200):
+                logger.log_nowait(f'message {i:04d}')
+            logger.close()
+            self.assertTrue(log_path.with_name('converter.log.1').exists())
+
+
+class AsyncConsoleLoggerTest(TestCase):
+
+    def test_messages_from_loop_and_threads_are_queued(self):
+        console = io.StringIO()
+        with contextlib.redirect_stdout(console):
+            logger = AsyncConsoleLogger()
+
+            async def run() -> int:
+                tasks = len(asyncio.all_tasks())
+                for i in range(50):
+                    logger.log_nowait(f'loop {i}')
+                return len(asyncio.all_tasks()) - tasks
+            self.assertEqual(0, asyncio.run(run()))
+            with mock.patch.object(asyncio, 'run', side_effect=AssertionError('asyncio.run per message')):
+                thread = threading.Thread(target=lambda: [logger.log_nowait(f'thread {i}') for i in range(50)])
+                thread.start()
+                thread.join()
+            logger.close()
+        expected = [f'loop {i}' for i in range(50)] + [f'thread {i}' for i in range(50)]
+        self.assertEqual(expected, console.getvalue().splitlines())
@@ -0,0 +1,82 @@
+import asyncio
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import *
+from unittest import mock
+import watcher
+from watcher import *
+
+
+class PollingWatcherTest(TestCase):
+
+    SETTLE = 0.3
+    INTERVAL = 0.05
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temp_dir.name)
+        self.file = self.directory.joinpath('bulletin.txt')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def watch(self, scenario) -> list[tuple[Path, float]]:
+        async def run() -> list[tuple[Path, float]]:
+            stop = asyncio.Event()
+            events = list()
+
+            async def collect():
+                async for file in PollingWatcher(self.directory, self.SETTLE, self.INTERVAL).changes(stop):
+                    events.append((file, time.monotonic()))
+            collector = asyncio.create_task(collect())
+            await asyncio.sleep(self.INTERVAL)
+            await scenario()
+            await asyncio.sleep(self.SETTLE * 3)
+            stop.set()
+            await collector
+            return events
+        return asyncio.run(run())
+
+    def append(self, text: str) -> None:
+        with open(self.file, 'a', encoding='utf-8') as file:
+            file.write(text)
+
+    def test_file_written_in_two_bursts_yields_one_event(self):
+        async def scenario():
+            self.append('first part\n')
+            await asyncio.sleep(self.SETTLE / 2)
+            self.append('second part\n')
+        self.assertEqual([self.file], [file for file, _ in self.watch(scenario)])
+
+    def test_partially_written_file_is_not_emitted_early(self):
+        last_write = list()
+
+        async def scenario():
+            for _ in range(6):
+                self.append('part\n')
+                last_write[:] = [time.monotonic()]
+                await asyncio.sleep(self.SETTLE / 3)
+        events = self.watch(scenario)
+        self.assertEqual([self.file], [file for file, _ in events])
+        self.assertGreaterEqual(events[0][1] - last_write[0], self.SETTLE)
+
+    def test_removed_file_emits_nothing(self):
+        async def scenario():
+            self.append('part\n')
+            await asyncio.sleep(self.SETTLE / 3)
+            self.file.unlink()
+        self.assertEqual([], self.watch(scenario))
+
+
+class DirectoryWatcherTest(TestCase):
+
+    def test_falls_back_to_polling_without_inotify(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch.object(watcher, 'InotifyWatcher', side_effect=ImportError):
+                self.assertIsInstance(DirectoryWatcher.create(Path(directory)), PollingWatcher)
+
+
+if __name__ == '__main__':
+    unittest.main()
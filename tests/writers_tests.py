@@ -0,0 +1,166 @@
+import asyncio
+import tempfile
+import threading
+import unittest
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from unittest import *
+from unittest import mock
+import geopandas
+from converter import *
+from benchmarks.generators import *
+
+
+class OutputWriterTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = Path(self.temp_dir.name).joinpath('Output')
+        self.output_dir.mkdir()
+        points = stations(5)
+        self.frame = template(points)
+        self.other_frame = template(points[:2])
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def assertFrameEqual(self, expected: GeoDataFrame, actual: GeoDataFrame, by_name: bool = False):
+        if by_name:
+            expected, actual = expected.sort_values('name'), actual.sort_values('name')
+        self.assertEqual(list(expected['name']), list(actual['name']))
+        self.assertEqual(list(expected['river']), list(actual['river']))
+        self.assertTrue(all(a.equals(b) for a, b in zip(expected.geometry, actual.geometry)))
+
+    def test_shapefile_round_trip(self):
+        writer = ShapefileWriter(self.output_dir)
+        files = writer.write(self.frame, 'bulletin_ZS')
+        self.assertIn(self.output_dir.joinpath('bulletin_ZS', 'bulletin_ZS.shp'), files)
+        self.assertFrameEqual(self.frame, geopandas.read_file(writer.output_path('bulletin_ZS')))
+
+    def test_geoparquet_round_trip(self):
+        writer = GeoParquetWriter(self.output_dir)
+        self.assertEqual([writer.output_path('bulletin_ZS')], writer.write(self.frame, 'bulletin_ZS'))
+        self.assertFrameEqual(self.frame, geopandas.read_parquet(writer.output_path('bulletin_ZS')))
+
+    def test_flatgeobuf_round_trip(self):
+        writer = FlatGeobufWriter(self.output_dir)
+        self.assertEqual([writer.output_path('bulletin_ZS')], writer.write(self.frame, 'bulletin_ZS'))
+        self.assertFrameEqual(self.frame, geopandas.read_file(writer.output_path('bulletin_ZS')), by_name=True)
+
+    def test_geopackage_keeps_one_layer_per_bulletin(self):
+        writer = GeoPackageWriter(self.output_dir)
+        writer.write(self.frame, 'first_ZS')
+        writer.write(self.other_frame, 'second_ZS')
+        path = self.output_dir.joinpath('Output.gpkg')
+        self.assertEqual([path], writer.close())
+        self.assertEqual(path, writer.output_path('first_ZS'))
+        self.assertFrameEqual(self.frame, geopandas.read_file(path, layer='first_ZS'))
+        self.assertFrameEqual(self.other_frame, geopandas.read_file(path, layer='second_ZS'))
+
+    def test_zip_bundle_holds_every_output(self):
+        writer = OutputWriter.create(OutputFormat.GEOPARQUET, self.output_dir, bundle=True)
+        writer.write(self.frame, 'first_ZS')
+        writer.write(self.other_frame, 'second_ZS')
+        bundle_path, = writer.close()
+        with zipfile.ZipFile(bundle_path) as bundle:
+            self.assertEqual(['Output/first_ZS.parquet', 'Output/second_ZS.parquet'], sorted(bundle.namelist()))
+            with bundle.open('Output/second_ZS.parquet') as file:
+                self.assertFrameEqual(self.other_frame, geopandas.read_parquet(file))
+        self.assertEqual([bundle_path], list(self.output_dir.iterdir()))
+
+    def test_zip_bundles_closed_in_the_same_second_are_kept_apart(self):
+        bundles = list()
+        with mock.patch.object(tempfile, 'mkdtemp', wraps=tempfile.mkdtemp) as mkdtemp, \
+                mock.patch('writers.datetime') as clock:
+            clock.now.return_value = datetime(2024, 4, 1, 12, 0, 0)
+            for frame in (self.frame, self.other_frame):
+                writer = OutputWriter.create(OutputFormat.GEOPARQUET, self.output_dir, bundle=True)
+                writer.write(frame, 'bulletin_ZS')
+                bundles.extend(writer.close())
+        self.assertTrue(all(call.kwargs.get('dir') is None for call in mkdtemp.call_args_list))
+        self.assertEqual(sorted(bundles), sorted(self.output_dir.iterdir()))
+        self.assertEqual(2, len(set(bundles)))
+
+
+class EmptyResultTest(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self.temp_dir.name)
+        write_template(stations(5), self.base_dir.joinpath('template.shp'))
+        self.input_dir = self.base_dir.joinpath('Input')
+        self.input_dir.mkdir()
+        self.input_dir.joinpath('empty.txt').write_bytes(zs_bytes([]))
+        self.filesys = FileSys(self.input_dir, self.base_dir.joinpath('Output'), None, None,
+                               self.base_dir.joinpath('template.shp'))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_empty_result_is_not_written(self):
+        self.filesys.save(None, 'empty_ZS')
+        self.filesys.flush()
+        self.assertFalse(self.filesys.output_dir.joinpath('empty_ZS').exists())
+
+    def test_bulletin_with_empty_table_is_skipped(self):
+        app = ConverterApp(self.filesys, None, None, ParserZS)
+        metrics = app.convert()
+        self.assertEqual([], metrics.failures)
+        self.assertEqual(['empty.txt'], [file.file for file in metrics.files])
+        self.assertFalse(self.filesys.output_dir.joinpath('empty_ZS').exists())
+
+
+class WriterPoolTest(TestCase):
+
+    TIMEOUT = 5
+
+    def setUp(self):
+        self.pool = WriterPool(workers=4, max_pending=2)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.pool.close()
+
+    def blocked_write(self, written: list[int], value: int) -> None:
+        self.release.wait(self.TIMEOUT)
+        written.append(value)
+
+    def test_pending_writes_are_capped(self):
+        async def run():
+            written = list()
+            await self.pool.submit(self.blocked_write, written, 1)
+            await self.pool.submit(self.blocked_write, written, 2)
+            third = asyncio.create_task(self.pool.submit(self.blocked_write, written, 3))
+            await asyncio.sleep(0.1)
+            waiting = not third.done()
+            self.release.set()
+            await asyncio.wait_for(third, self.TIMEOUT)
+            await self.pool.flush()
+            return waiting, sorted(written)
+        self.assertEqual((True, [1, 2, 3]), asyncio.run(run()))
+
+    def test_flush_waits_for_pending_writes(self):
+        async def run():
+            written = list()
+            for value in range(2):
+                await self.pool.submit(self.blocked_write, written, value)
+            threading.Timer(0.1, self.release.set).start()
+            await self.pool.flush()
+            return sorted(written)
+        self.assertEqual([0, 1], asyncio.run(run()))
+
+    def test_writer_exception_reaches_caller(self):
+        def failing_write():
+            raise OSError('disk full')
+
+        async def run():
+            future = await self.pool.submit(failing_write)
+            with self.assertRaisesRegex(OSError, 'disk full'):
+                await future
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import re
+import tempfile
+from datetime import date
+from dataclasses import dataclass
+from pathlib import Path
+import pandas
+import geopandas
+from geopandas import GeoDataFrame
+
+
+@dataclass(frozen=True)
+class BulletinSource:
+    file: Path
+    ugms_code: str
+    bulletin_date: date
+
+    __DATE_PATTERNS = (
+        (re.compile(r'(?<!\d)(\d{4})[-_.]?(\d{2})[-_.]?(\d{2})(?!\d)'), (0, 1, 2)),
+        (re.compile(r'(?<!\d)(\d{1,2})[-_.](\d{1,2})[-_.](\d{4}|\d{2})(?!\d)'), (2, 1, 0)),
+    )
+
+    @classmethod
+    def of(cls, file: Path, ugms_code: str) -> 'BulletinSource':
+        return cls(file=file, ugms_code=ugms_code, bulletin_date=cls.date_of(file))
+
+    # Parsers drop the bulletin header, so the date comes from the file name, e.g. 2024-04-12.txt or
+    # Бюллетень 12.04.24.docx, and falls back to the day the file was last modified
+    @classmethod
+    def date_of(cls, file: Path) -> date:
+        for pattern, order in cls.__DATE_PATTERNS:
+            for match in pattern.finditer(file.stem):
+                bulletin_date = cls.__date(*(match.group(index + 1) for index in order))
+                if bulletin_date is not None:
+                    return bulletin_date
+        return date.fromtimestamp(file.stat().st_mtime)
+
+    @staticmethod
+    def __date(year: str, month: str, day: str) -> date | None:
+        if len(year) == 2:
+            year = f'20{year}'
+        try:
+            return date(int(year), int(month), int(day))
+        except ValueError:
+            return None
+
+
+class TimeSeriesStore:
+
+    DIRECTORY = 'timeseries'
+    SOURCE_COLUMN = 'source_file'
+    UGMS_CODE_PARTITION = 'ugms_code'
+    DATE_PARTITION = 'bulletin_date'
+
+    def __init__(self, root: Path):
+        self.__root = root
+
+    @property
+    def root(self) -> Path:
+        return self.__root
+
+    def partition_dir(self, ugms_code: str, bulletin_date: date) -> Path:
+        return self.__root.joinpath(f'{self.UGMS_CODE_PARTITION}={ugms_code}',
+                                    f'{self.DATE_PARTITION}={bulletin_date.isoformat()}')
+
+    def path(self, source: BulletinSource) -> Path:
+        return self.partition_dir(source.ugms_code, source.bulletin_date).joinpath(f'{source.file.stem}.parquet')
+
+    # Every bulletin is its own file in its partition, so appending a day never touches earlier partitions and
+    # converting a bulletin again only replaces its own file. The temporary name starts with a dot, which dataset
+    # readers skip, so a half written file is never read.
+    def append(self, geodataframe: GeoDataFrame, source: BulletinSource) -> Path:
+        path = self.path(source)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        rows = geodataframe.copy()
+        rows[self.SOURCE_COLUMN] = source.file.name
+        descriptor, temp_path = tempfile.mkstemp(dir=path.parent, prefix='.', suffix='.tmp')
+        os.close(descriptor)
+        try:
+            rows.to_parquet(temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return path
+
+    def partitions(self) -> list[tuple[str, date]]:
+        partitions = list()
+        for code_dir in self.__partition_dirs(self.__root, self.UGMS_CODE_PARTITION):
+            for date_dir in self.__partition_dirs(code_dir, self.DATE_PARTITION):
+                partitions.append((self.__partition_value(code_dir),
+                                   date.fromisoformat(self.__partition_value(date_dir))))
+        return sorted(partitions)
+
+    # Parsers of different UGMS produce different columns, the frames are concatenated instead of being read as
+    # one pyarrow dataset that would keep only the columns of the first file
+    def read(self,
+             ugms_code: str = None,
+             start: date = None,
+             end: date = None) -> GeoDataFrame | None:
+        frames = list()
+        for code, bulletin_date in self.partitions():
+            if ugms_code is not None and code != ugms_code:
+                continue
+            if (start is not None and bulletin_date < start) or (end is not None and bulletin_date > end):
+                continue
+            for file in sorted(self.partition_dir(code, bulletin_date).glob('*.parquet')):
+                frame = geopandas.read_parquet(file)
+                frame[self.UGMS_CODE_PARTITION] = code
+                frame[self.DATE_PARTITION] = bulletin_date
+                frames.append(frame)
+        if not frames:
+            return None
+        return GeoDataFrame(pandas.concat(frames, ignore_index=True), crs=frames[0].crs)
+
+    @staticmethod
+    def __partition_dirs(directory: Path, name: str) -> list[Path]:
+        if not directory.exists():
+            return list()
+        return [child for child in directory.iterdir() if child.is_dir() and child.name.startswith(f'{name}=')]
+
+    @staticmethod
+    def __partition_value(directory: Path) -> str:
+        return directory.name.split('=', 1)[1]
@@ -1,4 +1,13 @@
+import asyncio
+import logging
+import queue
+import sys
+import threading
+import time
 from abc import ABC, abstractmethod
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
 
 
 class Logger(ABC):
@@ -8,12 +17,103 @@ class Logger(ABC):
     async def log(message: str) -> None:
         pass
 
+    def log_nowait(self, message: str) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(self.log(message))
+            return
+        loop.create_task(self.log(message))
 
-class AsyncConsoleLogger(Logger):
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class BufferedLogger(Logger):
+
+    __STOP = object()
+
+    def __init__(self,
+                 console: bool = True,
+                 file_path: Path | str = None,
+                 max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 5,
+                 batch_size: int = 256,
+                 flush_interval: float = 0.2):
+        self.__console = console
+        self.__file = None
+        if file_path is not None:
+            self.__file = RotatingFileHandler(file_path, maxBytes=max_bytes, backupCount=backup_count,
+                                              encoding='utf-8')
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+        self.__queue = queue.Queue()
+        self.__thread = threading.Thread(target=self.__run, name='logger', daemon=True)
+        self.__thread.start()
+
+    async def log(self, message: str) -> None:
+        self.log_nowait(message)
+
+    def log_nowait(self, message: str) -> None:
+        self.__queue.put((datetime.now(), message))
+
+    def flush(self) -> None:
+        if self.__thread.is_alive():
+            self.__queue.join()
+
+    def close(self) -> None:
+        if not self.__thread.is_alive():
+            return
+        self.__queue.put(self.__STOP)
+        self.__thread.join()
+        if self.__file is not None:
+            self.__file.close()
+
+    def __run(self) -> None:
+        while True:
+            batch = self.__next_batch()
+            messages = [entry for entry in batch if entry is not self.__STOP]
+            try:
+                self.__write(messages)
+            except OSError:
+                pass
+            finally:
+                for _ in batch:
+                    self.__queue.task_done()
+            if len(messages) != len(batch):
+                return
+
+    def __next_batch(self) -> list:
+        batch = [self.__queue.get()]
+        deadline = time.monotonic() + self.__flush_interval
+        while len(batch) < self.__batch_size and batch[-1] is not self.__STOP:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.__queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def __write(self, messages: list[tuple[datetime, str]]) -> None:
+        if not messages:
+            return
+        if self.__console:
+            sys.stdout.write(''.join(f'{message}\n' for _, message in messages))
+            sys.stdout.flush()
+        if self.__file is not None:
+            text = '\n'.join(f'{timestamp.isoformat(sep=" ", timespec="seconds")} {message}'
+                             for timestamp, message in messages)
+            self.__file.emit(logging.makeLogRecord({'msg': text}))
+
+
+# Goes through the BufferedLogger queue, log_nowait from the event loop or a writer thread only enqueues the message
+class AsyncConsoleLogger(BufferedLogger):
 
     def __init__(self):
+        super().__init__(console=True)
         self.logs = list()
-
-    @staticmethod
-    async def log(message: str) -> None:
-        print(message)
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator
+
+
+class DirectoryWatcher(ABC):
+
+    def __init__(self, directory: Path, settle: float = 2.0, interval: float = 1.0):
+        self._directory = directory
+        self._interval = interval
+        self.__settle = settle
+        self.__pending: dict[Path, tuple[tuple[int, int], float]] = dict()
+        self.__seen: dict[Path, tuple[int, int]] = dict()
+
+    @staticmethod
+    def create(directory: Path, settle: float = 2.0, interval: float = 1.0) -> 'DirectoryWatcher':
+        try:
+            return InotifyWatcher(directory, settle, interval)
+        except (ImportError, OSError):
+            return PollingWatcher(directory, settle, interval)
+
+    async def changes(self, stop: asyncio.Event = None) -> AsyncIterator[Path]:
+        self._start()
+        try:
+            for file in self._directory.iterdir():
+                self.__touch(file)
+            while stop is None or not stop.is_set():
+                for file in await self._wait_for_events():
+                    self.__touch(file)
+                for file in self.__settled():
+                    yield file
+        finally:
+            self._stop()
+
+    def _start(self) -> None:
+        pass
+
+    def _stop(self) -> None:
+        pass
+
+    @abstractmethod
+    async def _wait_for_events(self) -> list[Path]:
+        pass
+
+    def __touch(self, file: Path) -> None:
+        signature = self.__signature(file)
+        if signature is None or signature == self.__seen.get(file):
+            self.__pending.pop(file, None)
+            return
+        pending = self.__pending.get(file)
+        if pending is None or pending[0] != signature:
+            self.__pending[file] = (signature, time.monotonic())
+
+    def __settled(self) -> list[Path]:
+        now = time.monotonic()
+        settled = list()
+        for file, (signature, since) in list(self.__pending.items()):
+            current = self.__signature(file)
+            if current is None:
+                del self.__pending[file]
+            elif current != signature:
+                self.__pending[file] = (current, now)
+            elif now - since >= self.__settle:
+                del self.__pending[file]
+                self.__seen[file] = signature
+                settled.append(file)
+        return settled
+
+    @staticmethod
+    def __signature(file: Path) -> tuple[int, int] | None:
+        try:
+            stat = file.stat()
+        except OSError:
+            return None
+        if not file.is_file():
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+
+class PollingWatcher(DirectoryWatcher):
+
+    async def _wait_for_events(self) -> list[Path]:
+        await asyncio.sleep(self._interval)
+        return list(self._directory.iterdir())
+
+
+class InotifyWatcher(DirectoryWatcher):
+
+    def __init__(self, directory: Path, settle: float = 2.0, interval: float = 1.0):
+        super().__init__(directory, settle, interval)
+        from inotify_simple import INotify, flags
+        self.__inotify = INotify()
+        self.__mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.MODIFY
+
+    def _start(self) -> None:
+        self.__inotify.add_watch(str(self._directory), self.__mask)
+
+    def _stop(self) -> None:
+        self.__inotify.close()
+
+    async def _wait_for_events(self) -> list[Path]:
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        loop.add_reader(self.__inotify.fileno(), ready.set)
+        try:
+            await asyncio.wait_for(ready.wait(), self._interval)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            loop.remove_reader(self.__inotify.fileno())
+        return [self._directory.joinpath(event.name) for event in self.__inotify.read(timeout=0)]
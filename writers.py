@@ -0,0 +1,206 @@
+import asyncio
+import functools
+import itertools
+import shutil
+import tempfile
+import zipfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from geopandas import GeoDataFrame
+from timeseries import *
+
+
+class OutputFormat(Enum):
+    SHAPEFILE = 'shp'
+    GEOPARQUET = 'parquet'
+    FLATGEOBUF = 'fgb'
+    GEOPACKAGE = 'gpkg'
+    TIMESERIES = 'timeseries'
+
+
+class OutputWriter(ABC):
+
+    def __init__(self, output_dir: Path):
+        self._output_dir = output_dir
+
+    @staticmethod
+    def create(output_format: OutputFormat, output_dir: Path, bundle: bool = False) -> 'OutputWriter':
+        if bundle:
+            return ZipBundleWriter(output_dir, output_format)
+        return _WRITERS[output_format](output_dir)
+
+    @abstractmethod
+    def write(self, geodataframe: GeoDataFrame, name: str, source: BulletinSource = None) -> list[Path]:
+        pass
+
+    def output_path(self, name: str) -> Path | None:
+        return None
+
+    def close(self) -> list[Path]:
+        return list()
+
+
+class ShapefileWriter(OutputWriter):
+
+    def output_path(self, name: str) -> Path | None:
+        return self._output_dir.joinpath(name)
+
+    def write(self, geodataframe: GeoDataFrame, name: str, source: BulletinSource = None) -> list[Path]:
+        output_dir = self._output_dir.joinpath(name)
+        if not (output_dir.exists()):
+            Path.mkdir(output_dir)
+        file_path = output_dir.joinpath(f'{name}.shp')
+        geodataframe.to_file(str(file_path), encoding='utf-8')
+        return list(output_dir.iterdir())
+
+
+class GeoParquetWriter(OutputWriter):
+
+    def output_path(self, name: str) -> Path | None:
+        return self._output_dir.joinpath(f'{name}.parquet')
+
+    def write(self, geodataframe: GeoDataFrame, name: str, source: BulletinSource = None) -> list[Path]:
+        file_path = self.output_path(name)
+        geodataframe.to_parquet(file_path)
+        return [file_path]
+
+
+class FlatGeobufWriter(OutputWriter):
+
+    def output_path(self, name: str) -> Path | None:
+        return self._output_dir.joinpath(f'{name}.fgb')
+
+    def write(self, geodataframe: GeoDataFrame, name: str, source: BulletinSource = None) -> list[Path]:
+        file_path = self.output_path(name)
+        geodataframe.to_file(str(file_path), driver='FlatGeobuf')
+        return [file_path]
+
+
+class GeoPackageWriter(OutputWriter):
+
+    def __init__(self, output_dir: Path):
+        super().__init__(output_dir)
+        self.__file_path = output_dir.joinpath(f'{output_dir.name}.gpkg')
+        self.__written = False
+
+    def output_path(self, name: str) -> Path | None:
+        return self.__file_path
+
+    def write(self, geodataframe: GeoDataFrame, name: str, source: BulletinSource = None) -> list[Path]:
+        geodataframe.to_file(str(self.__file_path), layer=name, driver='GPKG')
+        self.__written = True
+        return list()
+
+    def close(self) -> list[Path]:
+        return [self.__file_path] if self.__written else list()
+
+
+class TimeSeriesWriter(OutputWriter):
+
+    def __init__(self, output_dir: Path):
+        super().__init__(output_dir)
+        self.__store = TimeSeriesStore(output_dir.joinpath(TimeSeriesStore.DIRECTORY))
+        self.__written: dict[str, Path] = dict()
+
+    def output_path(self, name: str) -> Path | None:
+        return self.__written.get(name)
+
+    def write(self, geodataframe: GeoDataFrame, name: str, source: BulletinSource = None) -> list[Path]:
+        if source is None:
+            raise ValueError(f'{name} has no bulletin source to partition by')
+        path = self.__store.append(geodataframe, source)
+        self.__written[name] = path
+        return [path]
+
+
+class ZipBundleWriter(OutputWriter):
+
+    def __init__(self, output_dir: Path, output_format: OutputFormat):
+        super().__init__(output_dir)
+        self.__output_format = output_format
+        self.__bundle = None
+        self.__temp_dir = None
+        self.__writer = None
+
+    def write(self, geodataframe: GeoDataFrame, name: str, source: BulletinSource = None) -> list[Path]:
+        if self.__bundle is None:
+            self.__open()
+        self.__add(self.__writer.write(geodataframe, name, source))
+        return list()
+
+    def close(self) -> list[Path]:
+        if self.__bundle is None:
+            return list()
+        self.__add(self.__writer.close())
+        bundle_path = Path(self.__bundle.filename)
+        self.__bundle.close()
+        shutil.rmtree(self.__temp_dir, ignore_errors=True)
+        self.__bundle = None
+        return [bundle_path]
+
+    # The outputs are staged in the system temp dir, so a crash leaves nothing in output_dir but the bundle itself
+    def __open(self) -> None:
+        self.__bundle = self.__create_bundle()
+        self.__temp_dir = Path(tempfile.mkdtemp(prefix=f'{self._output_dir.name}_'))
+        self.__writer = OutputWriter.create(self.__output_format, self.__temp_dir.joinpath(self._output_dir.name))
+        Path.mkdir(self.__temp_dir.joinpath(self._output_dir.name))
+
+    # Bundles closed within the same second get a numbered suffix instead of replacing each other
+    def __create_bundle(self) -> zipfile.ZipFile:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        name = f'{self._output_dir.name}_{timestamp}'
+        for attempt in itertools.count(1):
+            suffix = '' if attempt == 1 else f'_{attempt}'
+            try:
+                return zipfile.ZipFile(self._output_dir.joinpath(f'{name}{suffix}.zip'), 'x',
+                                       compression=zipfile.ZIP_DEFLATED)
+            except FileExistsError:
+                continue
+
+    def __add(self, files: list[Path]) -> None:
+        for file in files:
+            self.__bundle.write(file, file.relative_to(self.__temp_dir).as_posix())
+            file.unlink()
+
+
+class WriterPool:
+
+    def __init__(self, workers: int = 1, max_pending: int = 4):
+        self.__executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='writer')
+        self.__max_pending = max_pending
+        self.__slots = None
+        self.__loop = None
+        self.__pending = set()
+
+    async def submit(self, function, *args) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if self.__slots is None or self.__loop is not loop:
+            self.__slots = asyncio.Semaphore(self.__max_pending)
+            self.__loop = loop
+        await self.__slots.acquire()
+        future = loop.run_in_executor(self.__executor, function, *args)
+        self.__pending.add(future)
+        future.add_done_callback(functools.partial(self.__release, self.__slots))
+        return future
+
+    async def flush(self) -> None:
+        await asyncio.gather(*self.__pending)
+
+    def close(self) -> None:
+        self.__executor.shutdown(wait=True)
+
+    def __release(self, slots: asyncio.Semaphore, future: asyncio.Future) -> None:
+        self.__pending.discard(future)
+        slots.release()
+
+
+_WRITERS = {
+    OutputFormat.SHAPEFILE: ShapefileWriter,
+    OutputFormat.GEOPARQUET: GeoParquetWriter,
+    OutputFormat.FLATGEOBUF: FlatGeobufWriter,
+    OutputFormat.GEOPACKAGE: GeoPackageWriter,
+    OutputFormat.TIMESERIES: TimeSeriesWriter,
+}